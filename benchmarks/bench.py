@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+"""
+Orchestration benchmarks, run against stub executables instead of real media
+tools, so that they measure only this package's overhead:
+
+	python benchmarks/bench.py --output before.json
+	git checkout ...
+	python benchmarks/bench.py --output after.json
+
+Stubs for ffmpeg, ffprobe, mkvmerge, MP4Box, asfbin and avidemux3_cli are
+symlinks to stub.sh, which replays recordings/ and honors STUB_SLEEP and
+STUB_EXIT. Results are written as JSON.
+"""
+import argparse
+from contextlib import redirect_stdout
+import json
+import logging
+import os, os.path
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here)) # benchmark this checkout
+
+stub_names = [ 'ffmpeg', 'ffprobe', 'mkvmerge', 'MP4Box', 'asfbin', 'avidemux3_cli' ]
+media_names = { 'ffmpeg': 'input.mkv', 'mkvmerge': 'input.mkv', 'MP4Box': 'input.mp4',
+				'avidemux': 'input.avi', 'asfbin': 'input.WMV' }
+recordings = { 'ffmpeg': 'ffmpeg.stderr', 'mkvmerge': 'mkvmerge.stdout', 'MP4Box': 'MP4Box.stderr',
+			   'avidemux': 'avidemux3_cli.stdout', 'asfbin': 'asfbin.stdout' }
+
+
+def install_stubs(bindir):
+	for name in stub_names:
+		os.symlink(os.path.join(here, 'stub.sh'), os.path.join(bindir, name))
+	os.environ['PATH'] = bindir+os.pathsep+os.environ['PATH']
+def get_splits(n, duration=3600.):
+	step = duration/n
+	return [ ('{:.3f}'.format(i*step), '{:.3f}'.format(i*step+step/2)) for i in range(n) ]
+def write_m3u(filename, media_filename, n):
+	with open(filename, 'w') as ofo:
+		ofo.write('#EXTM3U\n')
+		for b, e in get_splits(n):
+			ofo.write('#EXTVLCOPT:start-time={}\n#EXTVLCOPT:stop-time={}\n#EXTINF:3600,cut\n{}\n'.format(b, e, media_filename))
+def measure(f, repeat):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		f()
+		times.append(time.perf_counter()-start)
+	return { 'repeat': repeat, 'min_s': min(times), 'median_s': statistics.median(times) }
+
+
+def bench_startup(repeat, results):
+	'''
+	Fresh interpreters: printing --help, and a dry run of one small job
+	'''
+	media_filename = media_names['ffmpeg']
+	open(media_filename, 'w').close()
+	write_m3u('startup.m3u', media_filename, 1)
+	env = dict(os.environ, PYTHONPATH=os.path.dirname(here))
+	script = 'import sys; from videoclipsplitter.cli import main; sys.exit(main(*sys.argv[1:]))'
+	for scenario, args in [ ('help', [ '--help' ]),
+							('dry_run', [ '-n', media_filename, 'startup.m3u' ]) ]:
+		command = [ sys.executable, '-c', script ]+args
+		run = lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		r = measure(run, repeat)
+		results.append(dict(benchmark='startup', scenario=scenario, **r))
+def bench_get_converters(repeat, results):
+	from videoclipsplitter.cli import get_converters
+	for name in sorted(set(media_names.values())):
+		r = measure(lambda: get_converters(name), repeat)
+		results.append(dict(benchmark='get_converters', filename=name, **r))
+def bench_get_commands(n, repeat, results):
+	from videoclipsplitter.cli import get_named_converters
+	splits = get_splits(n)
+	for cname, cobj in get_named_converters('mkvmerge,MP4Box,ffmpeg,avidemux,asfbin'):
+		r = measure(lambda: list(cobj.get_commands(media_names[cname], splits=list(splits))), repeat)
+		results.append(dict(benchmark='get_commands', converter=cname, cuts=n, per_cut_us=1e6*r['min_s']/n, **r))
+def bench_follow(n, repeat, results):
+	'''
+	Recorded output, repeated to about n lines, piped from cat through
+	streams.follow() into each converter's parse_line
+	'''
+	from videoclipsplitter.cli import get_named_converters
+	from videoclipsplitter.streams import follow
+	for cname, cobj in get_named_converters('mkvmerge,MP4Box,ffmpeg,avidemux,asfbin'):
+		filename = recordings[cname]
+		with open(os.path.join(here, 'recordings', filename), 'rb') as fi:
+			lines = fi.read().split(b'\n')
+		with open(filename, 'wb') as ofo:
+			ofo.write(b'\n'.join((lines*(n//len(lines)+1))[:n]))
+		command = [ 'sh', '-c', 'cat "$1" >&2' if filename.endswith('.stderr') else 'cat "$1"', 'sh', filename ]
+		def run():
+			proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+			with proc:
+				follow(proc, cobj.parse_line)
+		r = measure(run, repeat)
+		results.append(dict(benchmark='follow', converter=cname, lines=n, per_line_us=1e6*r['min_s']/n, **r))
+def bench_cli(n, repeat, results, jobs=os.cpu_count()):
+	from videoclipsplitter.cli import main
+	for cname in [ 'ffmpeg', 'MP4Box' ]:
+		media_filename = media_names[cname]
+		open(media_filename, 'w').close()
+		write_m3u('cuts.m3u', media_filename, n)
+		args = [ '-C', cname, '--jobs', str(jobs), media_filename, 'cuts.m3u' ]
+		r = measure(lambda: main(*args), repeat)
+		results.append(dict(benchmark='cli.main', converter=cname, cuts=n, jobs=jobs, per_cut_us=1e6*r['min_s']/n, **r))
+def bench_batch(njobs, cuts, repeat, results, concurrency=os.cpu_count()):
+	from videoclipsplitter.batch import get_jobs, run_batch
+	os.makedirs('batch', exist_ok=True)
+	for i in range(njobs):
+		media_filename = os.path.join('batch', 'input{:05d}.mkv'.format(i))
+		open(media_filename, 'w').close()
+		write_m3u(media_filename+'.m3u', os.path.basename(media_filename), cuts)
+	jobs = list(get_jobs('batch'))
+	r = measure(lambda: run_batch(jobs, concurrency=concurrency, converter_names='ffmpeg'), repeat)
+	results.append(dict(benchmark='batch', jobs=njobs, cuts=cuts, concurrency=concurrency, jobs_per_s=njobs/r['min_s'], **r))
+
+
+def get_argparser():
+	ap = argparse.ArgumentParser(description="Measure orchestration overhead with stub converters")
+	newarg = ap.add_argument
+	newarg('--sizes', default='1,100,10000', help="Comma-separated numbers of cuts")
+	newarg('--batch-jobs', default='10,100', help="Comma-separated numbers of jobs for batch scenarios")
+	newarg('--max-processes', type=int, default=1000, help="Skip end-to-end runs that would launch more stub processes than this")
+	newarg('--repeat', type=int, default=3)
+	newarg('--output', '-o', help="Write JSON here instead of stdout")
+	return ap
+def main(*args):
+	options = get_argparser().parse_args(args or None)
+	logging.getLogger('videoclipsplitter').setLevel(logging.CRITICAL)
+	try:
+		commit = subprocess.run([ 'git', 'rev-parse', 'HEAD' ], cwd=here,
+								stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+	except OSError:
+		commit = ''
+	results = []
+	with tempfile.TemporaryDirectory() as tmp:
+		os.environ['VIDEOCLIPSPLITTER_CACHE'] = os.path.join(tmp, 'cache')
+		os.environ['VIDEOCLIPSPLITTER_SCRATCH'] = tmp # dry runs keep their side files
+		os.makedirs(os.path.join(tmp, 'bin'))
+		install_stubs(os.path.join(tmp, 'bin'))
+		cwd = os.getcwd()
+		os.chdir(tmp)
+		try:
+			with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+				bench_startup(options.repeat, results)
+				bench_get_converters(options.repeat, results)
+				for n in (int(s) for s in options.sizes.split(',')):
+					bench_get_commands(n, options.repeat, results)
+					bench_follow(n, options.repeat, results)
+					if n <= options.max_processes:
+						bench_cli(n, options.repeat, results)
+				for n in (int(s) for s in options.batch_jobs.split(',')):
+					bench_batch(n, 10, options.repeat, results)
+		finally:
+			os.chdir(cwd)
+	report = { 'commit': commit,
+			   'python': platform.python_version(),
+			   'platform': platform.platform(),
+			   'cpus': os.cpu_count(),
+			   'results': results }
+	if options.output:
+		with open(options.output, 'w') as ofo:
+			json.dump(report, ofo, indent=1)
+	else:
+		json.dump(report, sys.stdout, indent=1)
+		print()
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,31 @@
+#! /bin/sh
+# Stands in for ffmpeg, ffprobe, mkvmerge, MP4Box, asfbin and avidemux3_cli,
+# through symlinks of those names. Replays recordings/NAME.stdout and
+# recordings/NAME.stderr, after sleeping $STUB_SLEEP seconds, then exits with
+# $STUB_EXIT.
+name=${0##*/}
+recordings=${STUB_RECORDINGS:-$(dirname "$(readlink -f "$0")")/recordings}
+
+case "$name $*" in
+	"ffprobe "*packet=*)
+		awk 'BEGIN { for (t = 0; t < 3600; t += 2.002) printf "%.6f,K_\n", t }'
+		exit 0 ;;
+	"ffprobe "*)
+		echo '{"format": {"duration": "3600.000000", "size": "1000000000", "bit_rate": "2222222"},
+"streams": [ {"codec_type": "video", "codec_name": "h264", "avg_frame_rate": "30000/1001", "r_frame_rate": "30000/1001", "width": 1280, "height": 720} ]}'
+		exit 0 ;;
+	"ffmpeg -version"|"ffmpeg -hide_banner -h"*)
+		echo "ffmpeg version stub segment_frames -progress"
+		exit 0 ;;
+	"mkvmerge --version")
+		echo "mkvmerge v9.8.0 ('Kuglblids') 64bit"
+		exit 0 ;;
+	"MP4Box -version")
+		echo "MP4Box - GPAC version stub" >&2
+		exit 0 ;;
+esac
+
+[ -n "$STUB_SLEEP" ] && sleep "$STUB_SLEEP"
+[ -f "$recordings/$name.stdout" ] && cat "$recordings/$name.stdout"
+[ -f "$recordings/$name.stderr" ] && cat "$recordings/$name.stderr" >&2
+exit ${STUB_EXIT:-0}
@@ -14,6 +14,7 @@ setup(name='videoclipsplitter',
 	  entry_points = {
 	    'console_scripts': [
 		  'VideoClipSplitter=videoclipsplitter.cli:main',
+		  'VideoClipSplitterBatch=videoclipsplitter.batch:main',
 		],
 	  },
       zip_safe=True,
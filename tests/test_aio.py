@@ -0,0 +1,40 @@
+import asyncio
+import sys
+
+import pytest
+
+from videoclipsplitter import ConverterBase, SplitterException
+from videoclipsplitter.aio import ConverterTimeout
+
+
+class Echo(ConverterBase):
+	dry_run = False
+	executable = sys.executable
+	def __init__(self, commands):
+		self.commands, self.lines = commands, []
+	def get_commands(self, *args, scratch=None, **kwargs):
+		return [ [ self.executable, '-c', c ] for c in self.commands ]
+	def parse_line(self, b, prefix='STDOUT'):
+		self.lines.append(b)
+
+
+async def collect(converter, **kwargs):
+	return [ result async for result in converter.run_async(**kwargs) ]
+
+
+def test_timeout_is_for_the_whole_job():
+	converter = Echo([ 'import time; time.sleep(0.4)' ]*4)
+	with pytest.raises(ConverterTimeout):
+		asyncio.run(collect(converter, jobs=1, timeout=1.))
+	assert len(asyncio.run(collect(Echo([ 'pass' ]*2), jobs=1, timeout=10.))) == 2
+
+
+def test_repeated_lines_are_summarized():
+	converter = Echo([ "print('same\\n'*5+'other')" ])
+	asyncio.run(collect(converter))
+	assert converter.lines == [ b'same', b'(Last message repeats 4 more times)', b'other' ]
+
+
+def test_unsupported_options_are_refused():
+	with pytest.raises(SplitterException, match='journal'):
+		Echo([ 'pass' ]).run_async(journal=object())
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+import pytest
+
+from videoclipsplitter import SplitterException
+from videoclipsplitter.cutlist import iter_cutlist
+
+
+def test_ini_syntax(tmp_path):
+	fn = tmp_path / 'movie.cutlist'
+	fn.write_text('[General]\n'
+		'Application=SomeCutter\n'
+		'ApplyToFile: movie 100% #2.avi\n'
+		'\n'
+		'[Cut0]\n'
+		'Start=10.5 ; seconds\n'
+		'Duration = 20\n'
+		'[Cut1]\n'
+		'Start:\n'
+		'  40\n'
+		'Duration=5\n'
+		'[Cut2]\n'
+		'Start=bad\n'
+		'Duration=5\n'
+		'[Cut3]\n'
+		'Start=60\n'
+		'Duration=1\n')
+	cuts = list(iter_cutlist(str(fn)))
+	assert [ (c.start, c.end, c.order) for c in cuts ] == [ (Decimal('10.5'), Decimal('30.5'), 0), (40, 45, 1), (60, 61, 2) ]
+	assert cuts[0].filename == 'movie 100% #2.avi'
+
+
+def test_unreadable(tmp_path):
+	fn = tmp_path / 'movie.cutlist'
+	fn.write_text('Start=10\n')
+	with pytest.raises(SplitterException):
+		list(iter_cutlist(str(fn)))
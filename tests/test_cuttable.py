@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from videoclipsplitter.cli import parse_files
+from videoclipsplitter.cuttable import CutTable, OPEN, parse_ticks
+
+
+def test_parse_ticks():
+	assert parse_ticks('1.5') == 1500000
+	assert parse_ticks(Decimal('0.0000004')) == 0
+	assert parse_ticks(2) == 2000000
+	assert parse_ticks('12', units='frames') == 12
+	assert parse_ticks(None) == OPEN
+	assert parse_ticks('') == OPEN
+
+
+def test_from_pairs_round_trip():
+	cuts = CutTable.from_pairs([ (None, '10'), ('20.25', None) ])
+	assert list(cuts) == [ (0, 10), (Decimal('20.25'), None) ]
+
+
+def test_m3u_open_end(tmp_path):
+	fn = tmp_path / 'cuts.m3u'
+	fn.write_text('#EXTM3U\n'
+		'#EXTINF:-1,whole\n' 'movie.mp4\n'
+		'#EXTVLCOPT:start-time=30\n' '#EXTINF:-1,tail\n' 'movie.mp4\n'
+		'#EXTVLCOPT:start-time=5\n' '#EXTVLCOPT:stop-time=15.5\n' '#EXTINF:100,middle\n' 'movie.mp4\n')
+	_, options = parse_files([ str(fn) ])
+	assert list(options['splits']) == [ (0, None), (30, None), (5, Decimal('15.5')) ]
+	assert OPEN == options['splits'].durations()[0]
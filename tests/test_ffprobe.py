@@ -0,0 +1,33 @@
+import pytest
+
+from videoclipsplitter import FFmpeg, FFprobe, SplitterException, analysis, keyframes
+from videoclipsplitter.FFprobe import FFprobeException, get_duration, parse_output
+
+
+audio_only = { 'format': { 'duration': '10' }, 'streams': [ { 'codec_type': 'audio' } ] }
+
+
+def test_unprobeable_files_name_the_file(monkeypatch, tmp_path):
+	monkeypatch.setattr(FFprobe, 'ffprobe', lambda fn: None)
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / 'movie.mp4').write_bytes(b'\0'*100)
+	with pytest.raises(FFprobeException, match='movie.mp4'):
+		get_duration('movie.mp4')
+	with pytest.raises(SplitterException, match='movie.mp4'):
+		analysis.detect('movie.mp4', kinds=[ 'black' ])
+	with pytest.raises(SplitterException, match='movie.mp4'):
+		FFmpeg.choose_strategy('movie.mp4', [ (1, 2) ])
+
+
+def test_no_frame_rate(monkeypatch):
+	monkeypatch.setattr(FFprobe, 'ffprobe', lambda fn: audio_only)
+	monkeypatch.setattr(keyframes, 'get_keyframes', lambda fn: [ 0., 2. ])
+	with pytest.raises(FFmpeg.FFmpegException, match='movie.mp4'):
+		FFmpeg.FFmpegConverter.pop_cuts('movie.mp4', { 'frames': [ (1, 2) ] })
+	with pytest.raises(keyframes.KeyframeException, match='movie.mp4'):
+		keyframes.snap_cuts('movie.mp4', { 'frames': [ (1, 2) ] })
+
+
+def test_unknown_frame_rate_parses():
+	p = parse_output('{"format": {}, "streams": [{"codec_type": "video", "avg_frame_rate": "0/0"}]}')
+	assert FFprobe.get_frame_rate(p) is None
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from videoclipsplitter.cuttable import CutTable
+from videoclipsplitter.FFmpeg import FFmpegConverter, batch_cuts
+from videoclipsplitter.optimize import optimize
+
+
+def ticks(*pairs):
+	return CutTable.from_pairs(pairs)
+
+
+def test_drop_empty_and_inverted():
+	table, report = optimize(ticks( ('1', '1'), ('5', '3'), ('2', '4') ))
+	assert list(table) == [ (2, 4) ]
+	assert len(report) == 2
+
+
+def test_clamp_and_drop_past_the_end():
+	table, report = optimize(ticks( ('5', '20'), ('30', '40'), ('1', None) ), file_end=10000000)
+	assert list(table) == [ (1, 10) ]
+	assert [ 'clamped' in line for line in report ] == [ True, False, False ]
+
+
+def test_merge_overlapping_and_adjacent_only():
+	table, report = optimize(ticks( ('0', '2'), ('1', '3'), ('3', '4'), ('4.5', '6'), ('8', None), ('9', '10') ))
+	assert list(table) == [ (0, 4), (Decimal('4.5'), 6), (8, None) ]
+	assert 3 == len(report)
+
+
+def test_close_cuts_share_a_process_without_merging():
+	cuts = [ (1., 2.), (2.5, 3.), (10., None) ]
+	assert [ [ n for n, _, _ in batch ] for batch in batch_cuts(cuts, gap=1.) ] == [ [ 1, 2 ], [ 3 ] ]
+	assert 3 == len(batch_cuts(cuts))
+	converter = FFmpegConverter(dry_run=True)
+	first, second = converter.get_commands('movie.mkv', strategy='seek', splits=cuts, batch_gap=1.)
+	assert first[:6] == [ converter.executable, '-nostdin', '-ss', '1.000000', '-i', 'movie.mkv' ]
+	assert first[6:] == [ '-map', '0', '-to', '1.000000', '-c', 'copy', 'movie-001.MKV',
+						  '-map', '0', '-ss', '1.500000', '-to', '2.000000', '-c', 'copy', 'movie-002.MKV' ]
+	assert converter.get_outputs(first) == [ 'movie-001.MKV', 'movie-002.MKV' ]
+	assert converter.get_outputs(second) == [ 'movie-003.MKV' ]
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from videoclipsplitter import FFprobe
+from videoclipsplitter.FFmpeg import FFmpegConverter
+from videoclipsplitter.gpac import GpacConverter
+from videoclipsplitter.planner import History, get_bytes_read
+
+
+@pytest.fixture
+def movie(monkeypatch, tmp_path):
+	fn = tmp_path / 'movie.mp4'
+	fn.write_bytes(b'\0'*100000)
+	monkeypatch.setattr(FFprobe, 'ffprobe', lambda fn: { 'format': { 'duration': '100', 'bit_rate': 8000 }, 'streams': [] })
+	return str(fn)
+
+
+def test_reads_follow_the_strategy(movie):
+	splits = [ (10, 20), (22, 30), (90, None) ]
+	ffmpeg = FFmpegConverter(dry_run=True)
+	assert get_bytes_read(ffmpeg, movie, { 'splits': splits }) == (100000, 1)
+	assert get_bytes_read(ffmpeg, movie, { 'splits': splits, 'strategy': 'seek' }) == (28000, 3)
+	assert get_bytes_read(ffmpeg, movie, { 'splits': splits, 'strategy': 'seek', 'batch_gap': 5 }) == (30000, 2)
+	assert get_bytes_read(GpacConverter(dry_run=True), movie, { 'splits': splits }) == (28000, 3)
+
+
+def test_history_uses_bytes_read(tmp_path):
+	fn = tmp_path / 'telemetry.jsonl'
+	with open(str(fn), 'w') as fo:
+		for record in [ { 'event': 'job', 'success': True, 'converter': 'MP4Box', 'container': '.MP4', 'mb_per_s': 500., 'read_mb_per_s': 50. },
+						{ 'event': 'job', 'success': True, 'converter': 'MP4Box', 'container': '.MP4', 'mb_per_s': 900. } ]:
+			fo.write(json.dumps(record)+'\n')
+	assert History(str(fn)).throughput('MP4Box', '.MP4') == (50., 1)
@@ -0,0 +1,35 @@
+import time
+from contextlib import closing
+
+from videoclipsplitter.probe_cache import ProbeCache
+
+
+def count(cache):
+	with closing(cache.connect()) as db:
+		return db.execute('SELECT COUNT(*) FROM probe_results').fetchone()[0]
+
+
+def test_eviction_on_open(tmp_path):
+	filename = str(tmp_path / 'probes.sqlite')
+	cache = ProbeCache(filename)
+	for n in range(5):
+		media = tmp_path / 'movie-{}.mp4'.format(n)
+		media.write_bytes(bytes([ n ])*100)
+		cache.put(str(media), b'x')
+	assert count(cache) == 5
+	cache = ProbeCache(filename, max_entries=3)
+	assert count(cache) == 3
+	assert cache.get(str(tmp_path / 'movie-4.mp4')) == b'x'
+
+
+def test_expired_rows_are_deleted(tmp_path):
+	filename = str(tmp_path / 'probes.sqlite')
+	media = tmp_path / 'movie.mp4'
+	media.write_bytes(b'\0'*100)
+	cache = ProbeCache(filename)
+	cache.put(str(media), b'x')
+	with closing(cache.connect()) as db, db:
+		db.execute('UPDATE probe_results SET last_access=?', (time.time()-2*cache.max_age,))
+	assert cache.get(str(media)) is None
+	cache = ProbeCache(filename)
+	assert count(cache) == 0
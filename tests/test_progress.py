@@ -0,0 +1,49 @@
+import sys
+import time
+
+from videoclipsplitter import ConverterBase
+from videoclipsplitter.progress import parse_ffmpeg_stats, parse_percent
+from videoclipsplitter.streams import LineSplitter
+
+
+class Echo(ConverterBase):
+	dry_run = False
+	executable = sys.executable
+
+
+def test_carriage_returns_end_lines():
+	s = LineSplitter()
+	assert s.feed(b'Progress: 10%\rProgress: 20%\r') == [ b'Progress: 10%', b'Progress: 20%' ]
+	assert s.feed(b'\nProgress: 30%') == []
+	assert s.close() == [ b'Progress: 30%' ]
+
+
+def test_percent_events_from_chunks():
+	s = LineSplitter()
+	events = []
+	for chunk in [ b'Splitting: |==   | (20/100)\rSplit', b'ting: |====| (40/100)\r', b'0-100%: ...... 60\r\n' ]:
+		for b in s.feed(chunk):
+			event = parse_percent(b.decode())
+			if event:
+				events.append(event.percent)
+	assert events == [ 20., 40., 60. ]
+
+
+def test_ffmpeg_stats():
+	event = parse_ffmpeg_stats('frame=  100 fps=0.0 q=-1.0 size=    1024kB time=00:00:03.50 bitrate= 0kbits/s speed=30x')
+	assert (event.media_s, event.speed, event.bytes_written) == (3.5, 30., 1<<20)
+
+
+def test_events_arrive_before_exit():
+	script = ("import sys, time\n"
+			  "for n in (10, 20, 30):\n"
+			  "	sys.stdout.write('Progress: %d%%\\r' % n); sys.stdout.flush(); time.sleep(0.1)\n"
+			  "time.sleep(1)\n")
+	arrived = []
+	started = time.perf_counter()
+	success, _ = Echo().execute([ sys.executable, '-c', script ],
+								on_progress=lambda e: arrived.append((e.percent, time.perf_counter()-started)))
+	elapsed = time.perf_counter()-started
+	assert success
+	assert [ p for p, _ in arrived ] == [ 10., 20., 30. ]
+	assert arrived[-1][1] < elapsed-0.5
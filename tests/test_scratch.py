@@ -0,0 +1,50 @@
+import os
+
+from videoclipsplitter.journal import command_key
+from videoclipsplitter.scratch import Scratch
+
+
+def smart_cut(scratch, near):
+	head, tail = scratch.bulk_path('movie-001.head.ts', near), scratch.bulk_path('movie-001.tail.ts', near)
+	list_filename = scratch.path('movie-001.concat')
+	with open(list_filename, 'w') as fo:
+		fo.write("file '{}'\nfile '{}'\n".format(head, tail))
+	return ( [ 'ffmpeg', '-i', 'movie.mp4', '-c:v', 'libx264', head ],
+			 [ 'ffmpeg', '-i', 'movie.mp4', '-c', 'copy', tail ],
+			 [ 'ffmpeg', '-f', 'concat', '-i', list_filename, 'movie-001.mp4' ] )
+
+
+def test_command_key_is_stable_across_scratch_dirs(tmp_path):
+	keys = []
+	for run in range(2):
+		with Scratch(root=str(tmp_path)) as scratch:
+			keys.append(command_key(smart_cut(scratch, str(tmp_path)), outputs=[ 'movie-001.mp4' ]))
+	assert keys[0] == keys[1]
+	with Scratch(root=str(tmp_path)) as scratch:
+		line = smart_cut(scratch, str(tmp_path))
+		with open(line[-1][4], 'a') as fo: # a changed list is a different command
+			fo.write("file 'other.ts'\n")
+		assert command_key(line, outputs=[ 'movie-001.mp4' ]) != keys[0]
+
+
+def test_dry_run_leaves_directories_to_the_script(tmp_path):
+	root, near = tmp_path / 'shm', tmp_path / 'out'
+	root.mkdir()
+	near.mkdir()
+	scratch = Scratch(root=str(root), dry_run=True)
+	head = scratch.bulk_path('movie-001.head.ts', str(near))
+	list_filename = scratch.path('movie-001.concat')
+	assert not os.listdir(str(near))
+	assert [ 'mkdir', '-p', os.path.dirname(head) ] in scratch.script_prologue()
+	[ rm ] = scratch.script_epilogue()
+	assert rm[:2] == [ 'rm', '-rf' ] and sorted(rm[2:]) == sorted([ os.path.dirname(head), os.path.dirname(list_filename) ])
+	scratch.cleanup()
+	assert os.listdir(str(root)) # kept for the script
+
+
+def test_scratch_is_removed(tmp_path):
+	with Scratch(root=str(tmp_path)) as scratch:
+		scratch.path('options')
+		scratch.bulk_path('part.ts', str(tmp_path))
+		assert 2 == len(os.listdir(str(tmp_path)))
+	assert not os.listdir(str(tmp_path))
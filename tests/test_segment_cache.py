@@ -0,0 +1,56 @@
+import os
+
+from videoclipsplitter.segment_cache import SegmentCache
+
+
+def make_cache(tmp_path, **kwargs):
+	source = tmp_path / 'movie.mp4'
+	source.write_bytes(b'\0'*1000)
+	return SegmentCache(str(source), dirname=str(tmp_path / 'cache'), **kwargs), str(source)
+
+
+def test_store_and_restore(tmp_path):
+	cache, source = make_cache(tmp_path)
+	output = str(tmp_path / 'cut-1.mp4')
+	line = [ 'ffmpeg', '-ss', '10', '-i', source, output ]
+	with open(output, 'wb') as fo:
+		fo.write(b'cut')
+	cache.store(line, [ output ])
+	os.unlink(output)
+	renumbered = str(tmp_path / 'cut-7.mp4')
+	assert cache.contains([ 'ffmpeg', '-ss', '10', '-i', source, renumbered ], [ renumbered ])
+	assert cache.restore([ 'ffmpeg', '-ss', '10', '-i', source, renumbered ], [ renumbered ])
+	with open(renumbered, 'rb') as fi:
+		assert fi.read() == b'cut'
+	assert not cache.contains([ 'ffmpeg', '-ss', '20', '-i', source, output ], [ output ])
+
+
+def test_empty_manifest_is_a_miss(tmp_path):
+	cache, source = make_cache(tmp_path)
+	output = str(tmp_path / 'cut-1.mp4')
+	line = [ 'ffmpeg', '-i', source, output ]
+	cache.store(line, [ output ]) # nothing was written
+	assert not cache.contains(line, [ output ])
+	assert not cache.restore(line, [ output ])
+	entry = cache.get_entry(cache.get_key(line, [ output ]))
+	os.makedirs(entry)
+	with open(os.path.join(entry, 'manifest.json'), 'w') as fo:
+		fo.write('[]')
+	assert not cache.contains(line, [ output ])
+	assert not cache.restore(line, [ output ])
+
+
+def test_eviction_keeps_a_running_total(tmp_path):
+	cache, source = make_cache(tmp_path, max_size=250)
+	lines = []
+	for n in range(3):
+		output = str(tmp_path / 'cut-{}.mp4'.format(n))
+		with open(output, 'wb') as fo:
+			fo.write(b'\0'*100)
+		lines.append( ([ 'ffmpeg', '-ss', str(n), '-i', source, output ], [ output ]) )
+		cache.store(*lines[-1])
+		entry = cache.get_entry(cache.get_key(*lines[-1]))
+		if os.path.isdir(entry): # stored in order of use, even on coarse timestamps
+			os.utime(os.path.join(entry, 'manifest.json'), (1000+n, 1000+n))
+	assert cache.total <= 250
+	assert [ cache.contains(*l) for l in lines ] == [ False, True, True ]
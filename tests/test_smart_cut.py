@@ -0,0 +1,37 @@
+import pytest
+
+from videoclipsplitter import FFmpeg
+from videoclipsplitter.scratch import Scratch
+
+
+stream = { 'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 41,
+		   'pix_fmt': 'yuv420p', 'time_base': '1/15360' }
+
+
+@pytest.fixture
+def converter(monkeypatch, tmp_path):
+	monkeypatch.setattr(FFmpeg, 'get_video_stream', lambda fn: stream)
+	monkeypatch.setattr(FFmpeg, 'get_keyframes', lambda fn: [ 0., 2., 4. ])
+	monkeypatch.chdir(tmp_path)
+	return FFmpeg.FFmpegConverter(dry_run=True)
+
+
+def test_head_matches_source_and_audio_is_copied_whole(converter, tmp_path):
+	with Scratch(root=str(tmp_path)) as scratch:
+		head, tail, join = converter.get_commands('movie.mp4', strategy='smart', splits=[ (1, 3) ], title='T', scratch=scratch)[0]
+	assert head[head.index('-map')+1] == '0:v:0'
+	for option, value in [ ('-pix_fmt', 'yuv420p'), ('-profile:v', 'high'), ('-level', '4.1') ]:
+		assert head[head.index(option)+1] == value
+	assert head[-1].endswith('.head.ts') and tail[-1].endswith('.tail.ts')
+	assert [ join[i+1] for i, arg in enumerate(join) if '-map' == arg ] == [ '0:v', '1:a?', '1:s?' ]
+	assert join[join.index('-t')+1] == '2.000000'
+	assert join[join.index('-video_track_timescale')+1] == '15360'
+	assert 'title=T' in join
+	assert converter.get_outputs((head, tail, join)) == [ 'movie-001.MP4' ]
+
+
+def test_filters_and_missing_scratch_are_errors(converter):
+	with pytest.raises(FFmpeg.FFmpegException):
+		converter.get_commands('movie.mp4', strategy='smart', splits=[ (1, 3) ])
+	with Scratch() as scratch, pytest.raises(FFmpeg.FFmpegException):
+		converter.get_commands('movie.mp4', strategy='smart', splits=[ (1, 3) ], filters=[ '-vf', 'hflip' ], scratch=scratch)
@@ -17,6 +17,7 @@ except:
 	debug = info = warning = fatal = error
 
 from . import ConverterBase, SplitterException, progress_bar
+from .discovery import get_executable
 
 
 errors = [ 'PROCESSING FAILED',
@@ -111,6 +112,7 @@ def probe(*args, commands=['-info', '-infohdr']):
 			return False
 	return True
 class AsfBinConverter(ConverterBase):
+	tool = 'asfbin'
 	@staticmethod
 	def match_filenames(*args):
 		r = []
@@ -122,14 +124,12 @@ class AsfBinConverter(ConverterBase):
 		return r
 	def __init__(self, **kwargs):
 		self.dry_run = kwargs.pop('dry_run', None)
-		if sys.platform.startswith('win'):
-			self.executable = 'ASFBIN.EXE'
-		else:
-			self.executable = 'asfbin'
+		self.executable = get_executable(self.tool)
 		self.extra_options = kwargs
 	def get_commands(self, input_filename,
 					 output_filename='{filepart}_.WMV',
 					 segments_filename='{basename}.AsfBin.segments',
+					 scratch=None,
 					 **kwargs):
 		options = kwargs
 		dirname, basename = os.path.split(input_filename)
@@ -142,14 +142,16 @@ class AsfBinConverter(ConverterBase):
 			segments_filename = segments_filename.format(**locals())
 		except:
 			warning( "segments_filename={}, which is probably not what you intended".format(segments_filename) )
+		side_file = scratch.path if scratch else (lambda name: name)
+		segments_filename = side_file(segments_filename)
 		commands = options.pop('commands', [ '-sep' ])+['-o', output_filename ]
 		if 'title' in options or 'attributes' in options:
 			a = options.pop('attributes', {})
 			if 'title' in options:
 				a['Title'] = options.pop('title')
-			attributes_filename = basename+'.AsfBin.attributes'
+			attributes_filename = side_file(basename+'.AsfBin.attributes')
 			with open(attributes_filename, 'w') as ofo:
-				for k, v in attributes.items():
+				for k, v in a.items():
 					ofo.write('{}={}\n'.format(k.title(), v))
 			commands += [ '-a', attributes_filename ]
 		if 'splits' in options:
@@ -162,10 +164,10 @@ class AsfBinConverter(ConverterBase):
 		if 'frames' in options:
 			raise NotImplementedError()
 		if 'chapters' in options: # these are pairs
-			markers_filename = basename+'.AsfBin.markers'
+			markers_filename = side_file(basename+'.AsfBin.markers')
 			with open(markers_filename, 'w') as ofo:
-				for t, n in options.pop(chapters):
-					ofo.writeline('{} {}\n'.format(t, n))
+				for t, n in options.pop('chapters'):
+					ofo.write('{} {}\n'.format(t, n))
 			commands += [ '-m', markers_filename ]
 		for k, v in options.items():
 			debug("Extra parameter unused: {}={}".format(k, v))
@@ -177,6 +179,8 @@ class AsfBinConverter(ConverterBase):
 		for b in stdout_contents.split(b'\n'):
 			parse_line(b)
 		return kwargs.pop('returncode', 0) == 0, []
+	def parse_line(self, b, prefix='STDOUT'):
+		return parse_line(b, prefix=prefix)
 def parse_line(b,
 			   prefix='STDOUT',
 			   progress=print if sys.stdout.isatty() else (lambda x: None),
@@ -193,10 +197,7 @@ def parse_line(b,
 	else:
 		debug(prefix+' '+line)
 
-if sys.platform.startswith('win'):
-	asfbin_executable = 'ASFBIN.EXE'
-else:
-	asfbin_executable = 'asfbin'
+asfbin_executable = get_executable('asfbin')
 debug("AsfBin is {}".format(asfbin_executable))
 
 def AsfBin_command(input_filename, output_filename='', segments_filename='', **kwargs):
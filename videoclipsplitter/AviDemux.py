@@ -1,4 +1,5 @@
 
+import functools
 import os.path
 import string
 import subprocess
@@ -15,7 +16,9 @@ except:
 		print(*args, file=sys.stderr, **kwargs)
 	debug = info = warning = fatal = error
 
-from . import ConverterBase, SplitterException
+from . import ConverterBase, SplitterException, stream_encoding
+from .discovery import get_executable
+from .util import avoid_duplicates, wrap, TinyPyException
 
 
 class AviDemuxException(SplitterException):
@@ -30,9 +33,14 @@ containers = [
 	('OGM') ]
 debug( "Default container is {}".format(containers[0]) )
 
-dirname, _ = os.path.split(__file__)
-with open(os.path.join(dirname,'AviDemux.template')) as fi:
-	script_template = fi.read()
+@functools.lru_cache()
+def get_script_template():
+	'''
+	Read on first use
+	'''
+	dirname, _ = os.path.split(__file__)
+	with open(os.path.join(dirname,'AviDemux.template')) as fi:
+		return fi.read()
 
 
 def probe(*args):
@@ -55,6 +63,7 @@ def probe(*args):
 			return False
 	return True
 class AviDemuxConverter(ConverterBase):
+	tool = 'avidemux'
 	@staticmethod
 	def check_filenames(*args):
 		for filename in args:
@@ -71,16 +80,14 @@ class AviDemuxConverter(ConverterBase):
 		return r
 	def __init__(self, **kwargs):
 		self.dry_run = kwargs.pop('dry_run', None)
-		if sys.platform.startswith('win'):
-			self.executable = 'AVIDEMUX.EXE'
-		else:
-			self.executable = 'avidemux3_cli'
+		self.executable = get_executable(self.tool)
 		self.extra_options = kwargs
 	def get_commands(self, input_filename,
 			output_filename='',
 			script_filename='',
 			container=containers[0],
 			video_filters=[],
+			scratch=None,
 			**kwargs):
 		options = kwargs
 		self.check_filenames(input_filename)
@@ -88,6 +95,8 @@ class AviDemuxConverter(ConverterBase):
 		filepart, ext = os.path.splitext(basename)
 		if not script_filename:
 			script_filename = basename+'.AviDemux.py'
+		if scratch:
+			script_filename = scratch.path(script_filename)
 		if output_filename:
 			output_filepart, output_ext = os.path.splitext(output_filename) # inelegant
 		else:
@@ -97,13 +106,13 @@ class AviDemuxConverter(ConverterBase):
 			container = containers[1]
 		parts, frames = [], []
 		if 'splits' in options:
-			# expects decimal seconds
-			parts = options.pop('splits')
+			# expects decimal seconds, as text that TinyPy can float()
+			parts = [ (str(b) if b else None, str(e) if e else None) for (b, e) in options.pop('splits') ]
 		if 'frames' in options:
 			frames = [ (b or None, e or None) for (b, e) in options.pop('frames') ]
 		if parts and frames:
 			warning("Refusing to split on both second and frame number, using {}".format(parts))
-		t = string.Template(options.pop('template', script_template))
+		t = string.Template(options.pop('template', None) or get_script_template())
 		# prepare local variables for TinyPy:
 		if parts:
 			parts = '\n'.join(wrap(parts))
@@ -131,6 +140,8 @@ class AviDemuxConverter(ConverterBase):
 		for b in avoid_duplicates(stdout_contents.split(b'\n'), encoding='latin-1'):
 			parse_line(b)
 		return kwargs.pop('returncode')==0, []
+	def parse_line(self, b, prefix='STDOUT'):
+		return parse_line(b, prefix=prefix)
 def parse_line(b, prefix='STDOUT', encoding='latin-1'):
 	line = b.decode(encoding).rstrip()
 	if not line or 'PerfectAudio' in line: # TONS of output
@@ -145,10 +156,7 @@ def parse_line(b, prefix='STDOUT', encoding='latin-1'):
 	else:
 		debug(prefix+' '+line)
 ###
-if sys.platform.startswith('win'):
-	executable = 'AVIDEMUX.EXE'
-else:
-	executable = 'avidemux3_cli'
+executable = get_executable('avidemux')
 debug("AviDemux is "+executable)
 def AviDemux_command(input_filename, output_filename='', script_filename='', container=containers[0], **kwargs):
 	if 255 < len(os.path.abspath(input_filename)):
@@ -173,7 +181,7 @@ def AviDemux_command(input_filename, output_filename='', script_filename='', con
 		frames = [ (b or None, e or None) for (b, e) in kwargs.pop('frames') ]
 	if parts and frames:
 		warning("Refusing to split on both second and frame number, using {}".format(parts))
-	t = string.Template(kwargs.pop('template', None) or script_template)
+	t = string.Template(kwargs.pop('template', None) or get_script_template())
 	# prepare local variables for TinyPy:
 	if parts:
 		parts = '\n'.join(wrap(parts))
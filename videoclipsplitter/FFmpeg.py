@@ -15,7 +15,11 @@ except:
 	debug = info = warning = fatal = error
 
 from . import ConverterBase, SplitterException, progress_bar, stream_encoding
-from .FFprobe import ffprobe as probe
+from .discovery import discover, get_executable
+from .FFprobe import ffprobe as probe, get_duration, get_video_codec, get_video_stream, require_frame_rate
+from .keyframes import get_keyframes, snap
+from .progress import parse_ffmpeg_progress, parse_ffmpeg_stats
+from .util import avoid_duplicates, flatten
 
 
 warnings = [ 'deprecated pixel format used, make sure you did set range correctly',
@@ -25,11 +29,92 @@ warnings = [ 'deprecated pixel format used, make sure you did set range correctl
 			 'VBV buffer size not set, muxing may fail' ]
 
 
+# re-encoders for the smart cut strategy, by ffprobe codec_name
+smart_cut_encoders = {
+	'h264':			'libx264',
+	'hevc':			'libx265',
+	'mpeg2video':	'mpeg2video',
+	'mpeg4':		'mpeg4',
+	'vp8':			'libvpx',
+	'vp9':			'libvpx-vp9' }
+# -profile:v for those encoders, by ffprobe profile
+smart_cut_profiles = {
+	'Constrained Baseline':	'baseline',
+	'Baseline':				'baseline',
+	'Main':					'main',
+	'Main 10':				'main10',
+	'High':					'high',
+	'High 10':				'high10',
+	'High 4:2:2':			'high422',
+	'High 4:4:4 Predictive':	'high444' }
+# MPEG-TS parts carry their parameter sets (SPS/PPS) before each keyframe, so
+# a re-encoded head and a copied tail can be joined
+in_band_parameter_sets = { 'h264', 'hevc' }
+
+
 class FFmpegException(SplitterException):
 	pass
 
 
+# Starting ffmpeg and seeking costs about as much as reading this much of the input
+seek_overhead_bytes = 16<<20
+
+
+def batch_cuts(cuts, gap=0.):
+	'''
+	Groups (start, end) pairs of seconds into batches of [ (number, start, end) ]
+	for one seeking process each. A cut joins the batch before it when it starts
+	less than gap after that batch's end, so the process reads the gap instead
+	of seeking again. Cuts keep their own outputs, so nothing in the gap is
+	written.
+	'''
+	batches = []
+	for n, (b, e) in enumerate(cuts, start=1):
+		if batches and gap:
+			_, last_b, last_e = batches[-1][-1]
+			if (last_e is not None) and (last_b <= b) and (b-last_e < gap):
+				batches[-1].append( (n, b, e) )
+				continue
+		batches.append([ (n, b, e) ])
+	return batches
+def choose_strategy(input_source, cuts, seek_overhead_bytes=seek_overhead_bytes, batch_gap=0.):
+	'''
+	Estimates the bytes read by the single-pass segment muxer (the whole file)
+	against one seeking process per batch of cuts (the batches, plus an
+	overhead per process), and returns 'segment' or 'seek'.
+	'''
+	size = os.path.getsize(input_source)
+	duration = get_duration(input_source).total_seconds()
+	if not (cuts and duration):
+		return 'segment'
+	batches = batch_cuts(cuts, batch_gap)
+	covered = sum(((batch[-1][2] or duration)-batch[0][1]) for batch in batches)
+	seek_cost = size*covered/duration + len(batches)*seek_overhead_bytes
+	strategy = 'seek' if seek_cost < size else 'segment'
+	debug( "{} cuts in {} processes cover {:.0%} of {:,} B, choosing {}".format(len(cuts), len(batches), covered/duration, size, strategy) )
+	return strategy
+
+
+def get_matching_options(stream):
+	'''
+	Encoder options that keep a re-encoded span compatible with stream, the
+	source's video: its pixel format, profile and level
+	'''
+	options = []
+	if stream.get('pix_fmt'):
+		options += [ '-pix_fmt', stream['pix_fmt'] ]
+	if stream.get('codec_name') in in_band_parameter_sets:
+		profile = smart_cut_profiles.get(stream.get('profile'))
+		if profile:
+			options += [ '-profile:v', profile ]
+		level = stream.get('level') or 0
+		if ('h264' == stream['codec_name']) and (0 < level):
+			options += [ '-level', '{:.1f}'.format(level/10) ]
+	return options
+
+
 class FFmpegConverter(ConverterBase):
+	tool = 'ffmpeg'
 	can_split = True
 	@staticmethod
 	def match_filenames(*args):
@@ -42,14 +127,39 @@ class FFmpegConverter(ConverterBase):
 		return r
 	def __init__(self, **kwargs):
 		self.dry_run = kwargs.pop('dry_run', None)
-		if sys.platform.startswith('win'):
-			self.executable = 'FFMPEG.EXE'
-		else:
-			self.executable = 'ffmpeg'
+		self.executable = get_executable(self.tool)
 		self.extra_options = kwargs
+	def required_capabilities(self, strategy='segment', **kwargs):
+		if 'segment' == strategy and 'frames' in kwargs:
+			return { 'segment_frames' }
+		return set()
+	def get_reads(self, input_source, cuts, duration, strategy='segment', batch_gap=0., **kwargs):
+		'''
+		The seek and smart strategies read only the cuts, in one process for
+		each batch of cuts. The others read the whole input once.
+		'''
+		if 'auto' == strategy:
+			strategy = choose_strategy(input_source, cuts, batch_gap=batch_gap or 0.)
+		if 'seek' == strategy:
+			batches = batch_cuts(cuts, batch_gap or 0.)
+		elif 'smart' == strategy:
+			batches = batch_cuts(cuts)
+		else:
+			return [ (0., duration) ]
+		return [ (batch[0][1], batch[-1][2] or duration) for batch in batches ]
 	def get_commands(self, input_source,
 			output_filename='{filepart}-%03d{output_ext}',
+			strategy='segment',
+			scratch=None,
 			**kwargs):
+		if 'auto' == strategy:
+			strategy = choose_strategy(input_source, self.pop_cuts(input_source, dict(kwargs)), batch_gap=kwargs.get('batch_gap') or 0.)
+		if 'seek' == strategy:
+			return self.get_seek_commands(input_source, output_filename, **kwargs)
+		elif 'smart' == strategy:
+			return self.get_smart_cut_commands(input_source, output_filename, scratch=scratch, **kwargs)
+		elif 'ranges' == strategy:
+			return self.get_range_commands(input_source, output_filename, **kwargs)
 		options = kwargs
 		dirname, basename = os.path.split(input_source)
 		filepart, ext = os.path.splitext(basename)
@@ -66,11 +176,11 @@ class FFmpegConverter(ConverterBase):
 		if 'frames' in options:
 			command += '-f segment -map 0 -flags +global_header'.split()
 			frame_splits = sorted(set(f for f in flatten(options.pop('frames')) if f)-set([0, '0']), key=float)
-			command += [ '-segment_frames', ','.join(frame_splits) ]
+			command += [ '-segment_frames', ','.join(str(f) for f in frame_splits) ]
 		elif 'splits' in options: # these are decimal times
 			command += '-f segment -map 0 -flags +global_header'.split()
 			time_splits = sorted(set(t for t in flatten(options.pop('splits')) if t)-set([0, '0']), key=float)
-			command += [ '-segment_times', ','.join(time_splits) ]
+			command += [ '-segment_times', ','.join(str(t) for t in time_splits) ]
 		command += filters or [ '-c:v', 'copy', '-c:a', 'copy' ]
 		try:
 			output_filename = output_filename.format(**locals())
@@ -80,6 +190,183 @@ class FFmpegConverter(ConverterBase):
 		for k, v in options.items():
 			debug("Extra parameter unused: {}={}".format(k, v))
 		return [ [self.executable, '-nostdin']+command ]
+	@staticmethod
+	def pop_cuts(input_source, options):
+		'''
+		Removes 'frames' or 'splits' from options, returning (start, end) pairs of
+		float seconds. An open end is None.
+		'''
+		if 'frames' in options:
+			fps = require_frame_rate(input_source, FFmpegException)
+			return [ (float(int(b)/fps) if b else 0, float(int(e)/fps) if e else None) for (b, e) in options.pop('frames') ]
+		return [ (float(b) if b else 0, float(e) if e else None) for (b, e) in options.pop('splits', []) ]
+	def get_range_commands(self, input_source,
+			output_filename='{filepart}-%03d{output_ext}',
+			**kwargs):
+		'''
+		One pass through the input, writing only the selected ranges: each cut
+		becomes its own output, trimmed with output options, so nothing between
+		cuts is written. Like the segment muxer, stream-copied outputs start at
+		the first packet at or after each cut, so consider snapping to keyframes.
+		'''
+		options = kwargs
+		dirname, basename = os.path.split(input_source)
+		filepart, ext = os.path.splitext(basename)
+		ext = ext.upper()
+		output_ext = options.pop('output_ext', ext)
+		if output_ext in ['.ASF', '.WMV']:
+			warning("Direct stream copy disabled")
+			output_ext = '.NUT'
+		filters = options.pop('filters', [])
+		metadata = [ '-metadata', 'title='+options.pop('title') ] if 'title' in options else []
+		cuts = self.pop_cuts(input_source, options)
+		for k, v in options.items():
+			debug("Extra parameter unused: {}={}".format(k, v))
+		command = [ self.executable, '-nostdin', '-i', input_source ]
+		for n, (b, e) in enumerate(cuts, start=1):
+			try:
+				my_filename = output_filename.format(**locals())
+				if '%' in my_filename:
+					my_filename = my_filename % n
+			except:
+				warning("Output filename is {}, which is probably not what you want".format(output_filename))
+				my_filename = output_filename
+			command += [ '-map', '0' ]+metadata
+			if b:
+				command += [ '-ss', '{:.6f}'.format(b) ]
+			if e:
+				command += [ '-to', '{:.6f}'.format(e) ]
+			command += (filters or [ '-c', 'copy' ])+[ my_filename ]
+		return [ command ]
+	def get_seek_commands(self, input_source,
+			output_filename='{filepart}-%03d{output_ext}',
+			batch_gap=0.,
+			**kwargs):
+		'''
+		One process per cut, each seeking the input straight to its start, so
+		only the cuts are read. These are independent and run in parallel with
+		jobs=. Cuts less than batch_gap seconds apart share a process, which
+		writes each to its own output.
+		'''
+		options = kwargs
+		dirname, basename = os.path.split(input_source)
+		filepart, ext = os.path.splitext(basename)
+		ext = ext.upper()
+		output_ext = options.pop('output_ext', ext)
+		if output_ext in ['.ASF', '.WMV']:
+			warning("Direct stream copy disabled")
+			output_ext = '.NUT'
+		filters = options.pop('filters', [])
+		metadata = [ '-metadata', 'title='+options.pop('title') ] if 'title' in options else []
+		cuts = self.pop_cuts(input_source, options)
+		for k, v in options.items():
+			debug("Extra parameter unused: {}={}".format(k, v))
+		commands = []
+		for batch in batch_cuts(cuts, batch_gap or 0.):
+			first_b = batch[0][1]
+			command = [ self.executable, '-nostdin' ]
+			if first_b:
+				command += [ '-ss', '{:.6f}'.format(first_b) ]
+			command += [ '-i', input_source ]
+			for n, b, e in batch:
+				try:
+					my_filename = output_filename.format(**locals())
+					if '%' in my_filename:
+						my_filename = my_filename % n
+				except:
+					warning("Output filename is {}, which is probably not what you want".format(output_filename))
+					my_filename = output_filename
+				if 1 == len(batch):
+					command += ([ '-t', '{:.6f}'.format(e-b) ] if e else [])+[ '-map', '0' ]
+				else: # each output starts with -map, and is trimmed relative to the seek
+					command += [ '-map', '0' ]
+					command += [ '-ss', '{:.6f}'.format(b-first_b) ] if (b != first_b) else []
+					command += [ '-to', '{:.6f}'.format(e-first_b) ] if e else []
+				command += metadata+(filters or [ '-c', 'copy' ])+[ my_filename ]
+			commands.append(command)
+		return commands
+	def get_smart_cut_commands(self, input_source,
+			output_filename='{filepart}-%03d{output_ext}',
+			list_filename='{filepart}-{n:03d}.concat',
+			encoder='',
+			encoder_options=[],
+			scratch=None,
+			**kwargs):
+		'''
+		Frame-accurate cuts without re-encoding everything: for each cut, only the
+		video from its start to the next keyframe is re-encoded, matching the
+		source's format. The rest of the video is stream-copied, and the two are
+		joined with the concat demuxer. Audio and other streams are copied in one
+		piece, so there's no gap at the join. The parts and the list joining them
+		go in scratch, a scratch.Scratch, which is required.
+		'''
+		options = kwargs
+		dirname, basename = os.path.split(input_source)
+		filepart, ext = os.path.splitext(basename)
+		ext = ext.upper()
+		output_ext = options.pop('output_ext', ext)
+		if options.pop('filters', None):
+			raise FFmpegException("Filters would only apply to the re-encoded part of each cut, try strategy=seek")
+		metadata = [ '-metadata', 'title='+options.pop('title') ] if 'title' in options else []
+		if scratch is None:
+			raise FFmpegException("Smart cuts need somewhere to keep their parts, pass scratch=")
+		cuts = self.pop_cuts(input_source, options)
+		stream = get_video_stream(input_source)
+		if not stream:
+			raise FFmpegException("No video stream in {}".format(input_source))
+		if not encoder:
+			encoder = smart_cut_encoders.get(stream.get('codec_name'))
+			if not encoder:
+				raise FFmpegException("No encoder known to match {} in {}, try encoder=".format(stream.get('codec_name'), input_source))
+		encoder_options = get_matching_options(stream)+list(encoder_options)
+		timescale = []
+		if output_ext.upper() in ( '.3GP', '.M4V', '.MOV', '.MP4' ) and stream.get('time_base'):
+			_, denominator = stream['time_base'].split('/')
+			timescale = [ '-video_track_timescale', denominator ]
+		keyframes = get_keyframes(input_source)
+		for k, v in options.items():
+			debug("Extra parameter unused: {}={}".format(k, v))
+		def seek(b, e, streams='0'):
+			return [ '-ss', '{:.6f}'.format(b), '-i', input_source ]+([ '-t', '{:.6f}'.format(e-b) ] if e else [])+[ '-map', streams ]
+		commands = []
+		for n, (b, e) in enumerate(cuts, start=1):
+			try:
+				my_filename = output_filename.format(**locals())
+				if '%' in my_filename:
+					my_filename = my_filename % n
+			except:
+				warning("Output filename is {}, which is probably not what you want".format(output_filename))
+				my_filename = output_filename
+			k = snap(b, keyframes, 'next') if (keyframes and b <= keyframes[-1]) else None
+			if k == b: # already on a keyframe
+				commands.append( [ self.executable, '-nostdin' ]+seek(b, e)+metadata+[ '-c', 'copy', my_filename ] )
+				continue
+			elif (k is None) or (e and (e <= k)): # no keyframe inside this cut
+				commands.append( [ self.executable, '-nostdin' ]+seek(b, e)+metadata+[ '-c:v', encoder ]+encoder_options+[ '-c:a', 'copy', my_filename ] )
+				continue
+			my_filepart, my_ext = os.path.splitext(my_filename)
+			if stream['codec_name'] in in_band_parameter_sets:
+				my_ext = '.ts'
+			near = os.path.dirname(my_filename) or '.'
+			head_filename = scratch.bulk_path(my_filepart+'.head'+my_ext, near)
+			tail_filename = scratch.bulk_path(my_filepart+'.tail'+my_ext, near)
+			my_list_filename = scratch.path(list_filename.format(**locals()))
+			with open(my_list_filename, 'w') as ofo:
+				for fn in (head_filename, tail_filename):
+					ofo.write("file '{}'\n".format(os.path.abspath(fn).replace("'", "'\\''")))
+			commands.append( (
+				[ self.executable, '-nostdin' ]+seek(b, k, '0:v:0')+[ '-c:v', encoder ]+encoder_options+[ head_filename ],
+				[ self.executable, '-nostdin' ]+seek(k, e, '0:v:0')+[ '-c', 'copy', tail_filename ],
+				[ self.executable, '-nostdin', '-f', 'concat', '-safe', '0', '-i', my_list_filename ]+seek(b, e, '0:v')
+				+[ '-map', '1:a?', '-map', '1:s?' ]+metadata+[ '-c', 'copy' ]+timescale+[ my_filename ]
+				) )
+		return commands
+	def get_outputs(self, command):
+		if isinstance(command, tuple): # smart cuts: the last command joins the parts
+			return [ command[-1][-1] ]
+		maps = [ i for i, arg in enumerate(command) if '-map' == arg ]
+		# with several outputs, each but the last is followed by the next -map
+		return [ command[i-1] for i in maps[1:] ]+[ command[-1] ]
 	def parse_output(self, streams, **kwargs):
 		_, stderr_contents = streams
 		debug( "{}B of stderr".format(len(stderr_contents)) )
@@ -87,6 +374,53 @@ class FFmpegConverter(ConverterBase):
 			for b in avoid_duplicates(stderr_contents.split(b'\n')):
 				parse_line(b)
 		return kwargs.pop('returncode', 0) == 0, []
+	def parse_line(self, b, prefix='STDOUT'):
+		return parse_line(b, prefix=prefix)
+	def progress_command(self, line):
+		'''
+		Asks ffmpeg for -progress key=value blocks on stdout in place of the
+		status line, where it supports them
+		'''
+		tool = discover(self.tool, self.executable)
+		if tool and ('progress' in tool.capabilities) and ('-nostdin' in line):
+			i = line.index('-nostdin')+1
+			return line[:i]+[ '-progress', 'pipe:1', '-nostats' ]+line[i:]
+		return line
+	def parse_progress(self, b, prefix='STDOUT', state=None):
+		line = b.decode(stream_encoding, 'replace').rstrip()
+		if 'STDOUT' == prefix:
+			return parse_ffmpeg_progress(line, state if state is not None else {})
+		return parse_ffmpeg_stats(line)
+	def expected_seconds(self, line):
+		'''
+		Seconds of output line writes: from -t, the longest -ss to -to range, or
+		else the rest of the input
+		'''
+		if isinstance(line, tuple): # smart cuts: the head and tail are joined
+			parts = [ self.expected_seconds(command) for command in line[:-1] ]
+			return sum(parts) if all(parts) else None
+		try:
+			if '-t' in line:
+				return float(line[line.index('-t')+1])
+			longest, ss, input_ss = None, 0., 0.
+			for n, (a, b) in enumerate(zip(line, line[1:])):
+				if '-map' == a:
+					ss = 0.
+				elif '-ss' == a:
+					ss = float(b)
+					if '-i' in line[n:]: # before the input, it seeks
+						input_ss, ss = ss, 0.
+				elif '-to' == a:
+					longest = max(longest or 0., float(b)-ss)
+			if longest:
+				return longest
+			input_source = line[line.index('-i')+1]
+			if not os.path.isfile(input_source) or input_source.endswith('.concat'):
+				return None
+			return get_duration(input_source).total_seconds()-input_ss
+		except Exception as e:
+			debug( "No expected duration for {}: {}".format(' '.join(line), e) )
+			return None
 ###
 def parse_line(b,
 			   prefix='STDERR',
@@ -122,10 +456,7 @@ def parse_line(b,
 			debug(prefix+' '+line)
 	#return(lastframeline) # progress bar
 ###
-if sys.platform.startswith('win'):
-	ffmpeg_executable = 'FFMPEG.EXE'
-else:
-	ffmpeg_executable = 'ffmpeg'
+ffmpeg_executable = get_executable('ffmpeg')
 debug("FFmpeg is {}".format(ffmpeg_executable))
 
 def FFmpeg_command(input_source, output_filename='{filepart}-%03d{output_ext}', **kwargs):
@@ -4,6 +4,7 @@ import datetime
 import decimal
 import fractions
 import json
+import os.path
 import subprocess
 import sys
 
@@ -19,39 +20,63 @@ except:
 	debug = info = warning = fatal = error
 
 from . import ConverterBase, SplitterException, stream_encoding
+from .discovery import get_executable
+from .probe_cache import get_cache
 
 
-class FFprobeException(Exception):
+class FFprobeException(SplitterException):
 	pass
 
 
-if sys.platform.startswith('win'):
-	executable = 'FFPROBE.EXE'
-else:
-	executable = 'ffprobe'
+executable = get_executable('ffprobe')
 
 
+def get_probe(input_arg):
+	'''
+	Returns the results of ffprobe on a filename, or input_arg if it's already
+	those results
+	'''
+	p = ffprobe(input_arg) if isinstance(input_arg, str) else input_arg
+	if not p:
+		raise FFprobeException("{} could not be probed".format(input_arg if isinstance(input_arg, str) else "Input"))
+	return p
 def get_duration(input_arg, encoding=stream_encoding):
-	if isinstance(input_arg, str): # is a filename
-		p = ffprobe(input_arg)
-	else:
-		p = input_arg
+	p = get_probe(input_arg)
+	if p['format'].get('duration') is None:
+		raise FFprobeException("No duration found for {}".format(input_arg if isinstance(input_arg, str) else p['format'].get('filename')))
 	return datetime.timedelta(seconds=float(p['format']['duration']))
 def get_frame_rate(input_arg, encoding=stream_encoding):
-	if isinstance(input_arg, str): # is a filename
-		p = ffprobe(input_arg)
-	else:
-		p = input_arg
+	'''
+	Returns the frame rate of the first video stream, or None without one
+	'''
+	p = get_probe(input_arg)
+	for s in p['streams']:
+		if 'video' == s['codec_type']:
+			return s.get('avg_frame_rate') or None # 0/0 when unknown
+	return None
+def require_frame_rate(input_arg, exception=FFprobeException):
+	'''
+	Returns the frame rate of input_arg, a filename, raising exception if it
+	has none, since frame numbers can't be converted without one
+	'''
+	fps = get_frame_rate(input_arg)
+	if not fps:
+		raise exception("No frame rate found for {}, so frame numbers can't be used".format(input_arg))
+	return fps
+def get_video_codec(input_arg, encoding=stream_encoding):
+	p = get_probe(input_arg)
 	for s in p['streams']:
 		if 'video' == s['codec_type']:
-			return s['avg_frame_rate']
+			return s['codec_name']
+	return None
+def get_video_stream(input_arg, encoding=stream_encoding):
+	p = get_probe(input_arg)
+	for s in p['streams']:
+		if 'video' == s['codec_type']:
+			return s
 	return None
 def get_video_size(input_arg, encoding=stream_encoding):
-	if isinstance(input_arg, str): # is a filename
-		p = ffprobe(input_arg)
-	else:
-		p = input_arg
-	assert p
+	p = get_probe(input_arg)
 	for s in p['streams']:
 		if 'video' == s['codec_type']:
 			return s['width'], s['height']
@@ -72,17 +97,33 @@ def parse_output(stdout_contents):
 		if s['codec_type'] == 'video':
 			for k, c in (('avg_frame_rate', fractions.Fraction), ('r_frame_rate', fractions.Fraction), ('duration', decimal.Decimal)):
 				if k in s:
-					s[k] = c(s[k])
+					try:
+						s[k] = c(s[k])
+					except (ArithmeticError, ValueError): # like 0/0
+						s[k] = None
 	return p
-def ffprobe(input_arg, command=['-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams'], encoding=stream_encoding):
+default_command = ['-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams']
+def ffprobe(input_arg, command=default_command, encoding=stream_encoding, use_cache=True):
+	'''
+	Results of the default command on regular files are kept in the probe cache,
+	as ffprobe's JSON text. That is parsed again on each call, so that callers
+	are free to modify what's returned.
+	'''
+	use_cache = use_cache and (command == default_command) and os.path.isfile(input_arg)
+	if use_cache:
+		outs = get_cache().get(input_arg)
+		if outs:
+			return parse_output(outs.decode(encoding))
 	proc = subprocess.Popen([executable]+command+[input_arg],
 		stdin=subprocess.DEVNULL,
 		stdout=subprocess.PIPE) # stderr goes to console
 	outs, _ = proc.communicate()
 	debug( "FFprobe output {:,} B".format(len(outs)) )
 	if proc.returncode == 0: # success
-		return parse_output(outs.decode(encoding))
-
+		p = parse_output(outs.decode(encoding))
+		if use_cache:
+			get_cache().put(input_arg, outs)
+		return p
 
 if '__main__' == __name__:
 	import sys
@@ -0,0 +1,169 @@
+#! /usr/bin/env python3
+"""
+Streaming reader for ffprobe's flat and compact output formats.
+
+Records are produced one frame at a time, so memory doesn't grow with the
+length of the recording:
+
+	for cut in blackdetect('movie.mkv', 'd=1'):
+		print(cut.start.t, cut.end.t)
+"""
+import collections
+from decimal import Decimal
+import re
+import subprocess
+import sys
+import tempfile
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from . import stream_encoding
+from .FFprobe import FFprobeException, executable as ffprobe_executable
+from .streams import iter_lines
+
+
+class Frame(collections.namedtuple('Frame', 'frame timestamp')):
+	@property
+	def t(self):
+		return self.timestamp
+	def __int__(self):
+		return int(self.frame or 0)
+	def __float__(self):
+		return float(self.timestamp or 0.0)
+	def __sub__(self, other):
+		return Frame(self.frame-other.frame, self.timestamp-other.timestamp)
+	def get_fps(self):
+		if self.timestamp:
+			return round( (self.frame+1)/Decimal(self.timestamp), 2)
+class BlackDetectCut(collections.namedtuple('BlackDetectCut', 'start end')):
+	pass
+
+
+flat_line = re.compile(r'\w+\.\w+\.\d+\.')
+
+
+def dequote(t, quote_chars='''"'`'''):
+	if 2 < len(t):
+		while t and (t[0] == t[-1]) and t[0] in quote_chars:
+			t = t[1:-1]
+	return t
+def iter_records(lines, section='frame', encoding=stream_encoding):
+	'''
+	Yields (index, fields) for each frame in ffprobe -of flat or -of compact
+	output. Tags are named as flat output names them, like lavfi_black_start, and
+	values are left as str. Only one frame is held at a time.
+	'''
+	flat_prefix = section+'s.'+section+'.'
+	index, fields = None, {}
+	compact_index = 0
+	for line in lines:
+		if isinstance(line, bytes):
+			line = line.decode(encoding, 'replace')
+		line = line.strip()
+		if not line:
+			continue
+		if line.startswith(flat_prefix): # frames.frame.12.tags.lavfi_black_start="5.005"
+			path, value = line[len(flat_prefix):].split('=', 1)
+			n, key = path.split('.', 1)
+			n = int(n)
+			if n != index:
+				if fields:
+					yield index, fields
+				index, fields = n, {}
+			if key.startswith('tags.'):
+				key = key[len('tags.'):]
+			fields[key] = dequote(value)
+		elif flat_line.match(line): # another section
+			continue
+		elif '=' in line or line == section or line.startswith(section+'|'): # frame|tag:lavfi.black_start=5.005
+			items = line.split('|')
+			if items[0] == section:
+				items.pop(0)
+			fields = {}
+			for item in items:
+				key, _, value = item.partition('=')
+				if key.startswith('tag:'):
+					key = key[len('tag:'):].replace('.', '_')
+				fields[key] = value
+			yield compact_index, fields
+			compact_index += 1
+			fields = {}
+	if fields:
+		yield index, fields
+def iter_cuts(records, start_key='lavfi_black_start', end_key='lavfi_black_end'):
+	'''
+	Pairs up consecutive black_start and black_end frames, yielding a
+	BlackDetectCut as soon as each pair is complete. A black_start on the first
+	frame is skipped, so the cuts run between the black parts.
+	'''
+	pending = None
+	first = True
+	for index, fields in records:
+		for key in (end_key, start_key):
+			if key not in fields:
+				continue
+			frame = Frame(index, Decimal(fields[key]))
+			if first:
+				first = False
+				if key == start_key and index == 0:
+					continue
+			if pending is None:
+				pending = frame
+			else:
+				yield BlackDetectCut(pending, frame)
+				pending = None
+	if first:
+		debug("Likely no black segments")
+	elif pending:
+		debug("Unpaired black detection at {}s ignored".format(pending.t))
+
+
+def lavfi_escape(text):
+	'''
+	Escapes text for use as an option value inside a filtergraph
+	'''
+	for c in '\\\':':
+		text = text.replace(c, '\\'+c)
+	for c in '\\\'[],;':
+		text = text.replace(c, '\\'+c)
+	return text
+def lavfi_records(graph, entries, executable=ffprobe_executable, encoding=stream_encoding, on_start=None):
+	'''
+	Runs ffprobe over a lavfi filtergraph, yielding (index, fields) for each frame
+	while ffprobe is still reading. entries is given to -show_entries. on_start,
+	if given, is called with the Popen object once ffprobe has started.
+	'''
+	command = [ executable, '-v', 'error', '-f', 'lavfi', graph,
+				'-show_entries', entries, '-of', 'flat' ]
+	debug( " ".join(command) )
+	with tempfile.TemporaryFile() as errors, \
+		 subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=errors) as proc:
+		if on_start:
+			on_start(proc)
+		finished = False
+		try:
+			yield from iter_records(iter_lines(proc.stdout), encoding=encoding)
+			finished = True
+		finally:
+			if not finished and proc.poll() is None: # abandoned by the caller
+				proc.kill()
+		if proc.wait():
+			errors.seek(0)
+			raise FFprobeException("{} failed: {}".format(executable, errors.read().decode(encoding, 'replace').strip()))
+def blackdetect(filename, options='', **kwargs):
+	'''
+	Runs ffprobe's blackdetect filter over filename, yielding each
+	BlackDetectCut while ffprobe is still reading. options are passed to the
+	filter, like 'd=1/15'.
+	'''
+	graph = 'movie={},blackdetect{}[out0]'.format(lavfi_escape(filename), '='+options if options else '')
+	return iter_cuts(lavfi_records(graph, 'tags=lavfi.black_start,lavfi.black_end', **kwargs))
@@ -1,5 +1,6 @@
 
 from datetime import timedelta
+import functools
 import os.path
 import string
 import subprocess
@@ -17,15 +18,21 @@ except:
 	debug = info = warning = fatal = error
 
 from . import ConverterBase, SplitterException, progress_bar
+from .discovery import get_executable
 from .chapters import make_chapters_file
 
 
 class MkvMergeException(SplitterException):
 	pass
 
-dirname, _ = os.path.split(__file__)
-with open(os.path.join(dirname,'MkvMerge.template')) as fi:
-	options_file_template = fi.read()
+@functools.lru_cache()
+def get_options_file_template():
+	'''
+	Read on first use
+	'''
+	dirname, _ = os.path.split(__file__)
+	with open(os.path.join(dirname,'MkvMerge.template')) as fi:
+		return fi.read()
 
 
 def probe(*args):
@@ -40,6 +47,7 @@ def probe(*args):
 			return False
 	return True
 class MkvMergeConverter(ConverterBase):
+	tool = 'mkvmerge'
 	@staticmethod
 	def match_filenames(*args, modest=True):
 		r = []
@@ -54,16 +62,18 @@ class MkvMergeConverter(ConverterBase):
 		return r
 	def __init__(self, **kwargs):
 		self.dry_run = kwargs.pop('dry_run', None)
-		if sys.platform.startswith('win'):
-			self.executable = 'MKVMERGE.EXE'
-		else:
-			self.executable = 'mkvmerge'
+		self.executable = get_executable(self.tool)
 		self.extra_options = kwargs
+	def required_capabilities(self, **kwargs):
+		if 'frames' in kwargs:
+			return { 'parts-frames' }
+		return set()
 	def get_commands(self, input_filename,
 					 output_filename='{filepart}.MKV',
 					 options_filename='{basename}.MkvMerge.options',
 					 chapters_filename='{basename}.chapters',
 					 split_style='',
+					 scratch=None,
 					 **kwargs):
 		warning("MkvMerge currently operates AFTER keyframes. Your output may not exactly match your cuts.")
 		options = kwargs
@@ -73,6 +83,8 @@ class MkvMergeConverter(ConverterBase):
 			options_filename = options_filename.format(**locals())
 		except:
 			warning( "options_filename={}, which is probably not what you intended".format(options_filename) )
+		if scratch:
+			options_filename = scratch.path(options_filename)
 		# output_filename needs to be formed to be used for template
 		# substitution below
 		try:
@@ -99,16 +111,35 @@ class MkvMergeConverter(ConverterBase):
 				chapters_filename = chapters_filename.format(**locals())
 			except:
 				warning("chapters_filename={}, which is probably not what you intended".format(chapters_filename))
+			if scratch:
+				chapters_filename = scratch.path(chapters_filename)
 			if make_chapters_file(options.pop('chapters'), chapters_filename):
 				commands += [ '--chapters', chapters_filename ]
 				commands += [ '--attach-file', chapters_filename ]
 		command_lines = '\n'.join(commands)
-		t = string.Template(options.pop('template', None) or options_file_template)
+		t = string.Template(options.pop('template', None) or get_options_file_template())
 		with open(options_filename, 'w') as ofo:
 			ofo.write(t.substitute(locals()))
 		for k, v in options.items():
 			debug("Extra parameter unused: {}={}".format(k, v))
 		return [ [ self.executable, '@'+options_filename ] ]
+	def get_outputs(self, command):
+		'''
+		Reads the output filename from the options file. Split output is numbered
+		like name-001.MKV.
+		'''
+		options_filename = next((arg[1:] for arg in command if arg.startswith('@')), None)
+		if not options_filename or not os.path.isfile(options_filename):
+			return []
+		with open(options_filename) as fi:
+			lines = [ line.rstrip('\n') for line in fi if not line.startswith('#') ]
+		if '-o' not in lines[:-1]:
+			return []
+		output_filename = lines[lines.index('-o')+1]
+		if '--split' in lines:
+			filepart, ext = os.path.splitext(output_filename)
+			return [ filepart+'-%03d'+ext ]
+		return [ output_filename ]
 	def parse_output(self, streams, **kwargs):
 		stdout_contents, stderr_contents = streams
 		debug( "{}B of stdout".format(len(stdout_contents)) )
@@ -118,6 +149,8 @@ class MkvMergeConverter(ConverterBase):
 		for b in stdout_contents.split(b'\n'):
 			parse_line(b)
 		return kwargs.pop('returncode')==0, []
+	def parse_line(self, b, prefix='STDOUT'):
+		return parse_line(b, prefix=prefix)
 def parse_line(b,
 			   prefix='STDOUT',
 			   progress=print if sys.stdout.isatty() else (lambda x: None),
@@ -125,9 +158,8 @@ def parse_line(b,
 	line = b.decode(encoding).rstrip()
 	if not line:
 		return
-	#if line.startswith('Progress:') and line.endswith('%'):
-	if '\r' in line:
-		progress(line.rsplit('\r', 1)[-1])
+	if line.startswith('Progress:'):
+		progress(line)
 		return
 	if line.startswith('Error:'):
 		raise MkvMergeException(line[len('Error:')+1:])
@@ -141,10 +173,7 @@ def parse_line(b,
 		debug(prefix+' '+line)
 
 
-if sys.platform.startswith('win'):
-	mkvmerge_executable = 'MKVMERGE.EXE'
-else:
-	mkvmerge_executable = 'mkvmerge'
+mkvmerge_executable = get_executable('mkvmerge')
 debug("MkvMerge is {}".format(mkvmerge_executable))
 def MkvMerge_command(input_filename,
 					 output_filename='{filepart}.MKV',
@@ -188,7 +217,7 @@ def MkvMerge_command(input_filename,
 			commands += [ '--chapters', chapters_filename ]
 			commands += [ '--attach-file', chapters_filename ]
 	command_lines = '\n'.join(commands)
-	t = string.Template(kwargs.pop('template', None) or options_file_template)
+	t = string.Template(kwargs.pop('template', None) or get_options_file_template())
 	with open(options_filename, 'w') as ofo:
 		ofo.write(t.substitute(locals()))
 	for k, v in kwargs.items():
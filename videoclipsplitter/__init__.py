@@ -5,17 +5,20 @@ import os
 import shlex
 import subprocess
 import sys
+import time
 
 
 logger = logging.getLogger('' if __name__ == '__main__' else __name__)
 debug, info, warning, error, fatal = logger.debug, logger.info, logger.warning, logger.error, logger.critical
 
-if sys.stderr.isatty():
-	import tqdm
-	progress_bar = tqdm.tqdm
-else:
-	def progress_bar(iterable, **kwargs):
+def progress_bar(iterable, **kwargs):
+	'''
+	tqdm on a terminal, imported on first use
+	'''
+	if not sys.stderr.isatty():
 		return iterable
+	import tqdm
+	return tqdm.tqdm(iterable, **kwargs)
 
 
 class SplitterException(Exception):
@@ -23,29 +26,261 @@ class SplitterException(Exception):
 
 
 filename_encoding = stream_encoding = 'UTF-8' # this is overridden on a per-method or per-module basis
+# streams, progress, scratch and telemetry are imported by the ConverterBase
+# methods that use them, so importing a backend doesn't load them
+
+
+def print_script(syntax, scratch=None):
+	'''
+	With a scratch.Scratch, the script makes the directories its commands need
+	and removes them afterwards
+	'''
+	print('#! /usr/bin/env sh')
+	prologue, epilogue = (scratch.script_prologue(), scratch.script_epilogue()) if scratch else ((), ())
+	for line in prologue:
+		print(' '.join(shlex.quote(s) for s in line))
+	for line in syntax:
+		if isinstance(line, tuple):
+			print(' && \\\n\t'.join(' '.join(shlex.quote(s) for s in command) for command in line))
+		else:
+			print(' '.join(shlex.quote(s) for s in line))
+	for line in epilogue:
+		print(' '.join(shlex.quote(s) for s in line))
 
 
 class ConverterBase:
 	'''
-	Subclasses should define .executable and implement get_commands() and parse_output()
+	Subclasses should define .executable and implement get_commands(), parse_line() and parse_output()
+
+	Output of each command is fed to parse_line() as it arrives, so that errors
+	raised there stop the command immediately. parse_output() is kept for the
+	short-lived probe commands.
+
+	Commands from get_commands() are assumed to be independent of each other, so
+	jobs=N runs up to N of them at once. Results are still yielded in the order
+	the commands were generated, and the first failure cancels the rest.
 	'''
-	def run(self, *args, **kwargs):
-		syntax = list(self.get_commands(*args, **kwargs))
+	jobs = 1
+	tool = None # key into discovery.default_names
+	def required_capabilities(self, **kwargs):
+		'''
+		Returns the discovery capabilities that get_commands(**kwargs) relies on
+		'''
+		return set()
+	def get_reads(self, input_source, cuts, duration, **kwargs):
+		'''
+		Returns a (start, end) pair of seconds for each process that
+		get_commands(**kwargs) starts, spanning what it reads of the input. cuts
+		are (start, end) pairs of float seconds, with None for an open end. By
+		default, one process reads the whole input.
+		'''
+		return [ (0., duration) ]
+	def check_tool(self, **kwargs):
+		'''
+		Returns why this converter can't run with these options, or None if it can
+		'''
+		from .discovery import discover
+		t = discover(self.tool, self.executable)
+		if t is None:
+			return "{} not found".format(self.executable)
+		missing = self.required_capabilities(**kwargs) - t.capabilities
+		if missing:
+			return "{} ({}) lacks {}".format(t.path, t.version, ', '.join(sorted(missing)))
+	def get_outputs(self, command):
+		'''
+		Returns the files command writes, possibly as printf-style patterns like
+		name-%03d.mkv. An empty list means they're unknown, and such a command is
+		never skipped when resuming. A tuple writes what its last command writes.
+		'''
+		return []
+	def execute_journaled(self, line, journal, execute=None):
+		'''
+		Skips line if journal has it complete, otherwise runs it and records it
+		'''
+		outputs = self.get_outputs(line)
+		if journal.is_complete(line, outputs):
+			debug( "Already complete: "+" ".join(outputs) )
+			return True, []
+		result = (execute or self.execute)(line)
+		success, _ = result
+		if success:
+			journal.record(line, outputs)
+		return result
+	def execute_cached(self, line, segment_cache, execute=None):
+		'''
+		Restores the outputs of line from segment_cache, otherwise runs it and
+		caches them
+		'''
+		outputs = self.get_outputs(line)
+		if segment_cache.restore(line, outputs):
+			return True, []
+		segment_cache.unlink_outputs(outputs)
+		result = (execute or self.execute)(line)
+		success, _ = result
+		if success:
+			segment_cache.store(line, outputs)
+		return result
+	def parse_progress(self, b, prefix='STDOUT', state=None):
+		'''
+		Returns a progress.ProgressEvent if b is a progress line, otherwise None.
+		state is a dict kept for the life of the command.
+		'''
+		from .progress import parse_percent
+		return parse_percent(b.decode(stream_encoding, 'replace').rstrip())
+	def progress_command(self, line):
+		'''
+		Returns line, changed if need be to report progress in a form
+		parse_progress() reads
+		'''
+		return line
+	def expected_seconds(self, line):
+		'''
+		Returns how many seconds of media line processes, or None if unknown
+		'''
+		return None
+	def execute(self, line, telemetry=None, on_progress=None):
+		'''
+		A tuple of commands is run in order, stopping at the first failure. With a
+		telemetry.JobTelemetry, the resources each command used are recorded.
+		on_progress is called with each progress.ProgressEvent.
+		'''
+		if isinstance(line, tuple):
+			for command in line:
+				result = self.execute(command, telemetry=telemetry, on_progress=on_progress)
+				success, _ = result
+				if not success:
+					break
+			return result
+		from .streams import follow
+		debug( " ".join(line) )
+		started = time.perf_counter()
+		usage = {}
+		def wait():
+			from .telemetry import wait4
+			returncode, u = wait4(proc)
+			usage.update(u)
+			return returncode
+		argv, parse_line = line, self.parse_line
+		if on_progress is not None:
+			from .progress import PENDING
+			argv, state = self.progress_command(line), {}
+			def parse_line(b, prefix='STDOUT'):
+				event = self.parse_progress(b, prefix=prefix, state=state)
+				if event is None:
+					self.parse_line(b, prefix=prefix)
+				elif event is not PENDING:
+					on_progress(event)
+		with subprocess.Popen(argv,
+					stdin=subprocess.DEVNULL,
+					stdout=subprocess.PIPE,
+					stderr=subprocess.PIPE) as proc:
+			returncode = follow(proc, parse_line, wait=wait if telemetry else None)
+		if telemetry:
+			telemetry.command(line, time.perf_counter()-started, returncode, usage,
+							  outputs=self.get_outputs(line) if returncode == 0 else ())
+		return returncode == 0, []
+	def parse_line(self, b, prefix='STDOUT', encoding=stream_encoding):
+		line = b.decode(encoding, 'replace').rstrip()
+		if line:
+			debug(prefix+' '+line)
+	def run(self, *args, jobs=None, journal=None, segment_cache=None, telemetry=None, progress_callback=None,
+			scratch=None, keep_scratch=False, **kwargs):
+		'''
+		Side files go in scratch, a scratch.Scratch. By default one is made for
+		this run and removed afterwards, unless keep_scratch or a dry run, whose
+		script refers to them. Other arguments are as for run_commands().
+		'''
+		own_scratch = scratch is None
+		if own_scratch:
+			from .scratch import Scratch
+			scratch = Scratch(keep=keep_scratch, dry_run=self.dry_run)
+		try:
+			syntax = list(self.get_commands(*args, scratch=scratch, **kwargs))
+			yield from self.run_commands(syntax, jobs=jobs, journal=journal, segment_cache=segment_cache,
+										 telemetry=telemetry, progress_callback=progress_callback, scratch=scratch)
+		finally:
+			if own_scratch:
+				scratch.cleanup()
+	def run_commands(self, syntax, jobs=None, journal=None, segment_cache=None, telemetry=None, progress_callback=None,
+					 scratch=None):
+		'''
+		With a journal.Journal, commands already completed are skipped. With a
+		segment_cache.SegmentCache, outputs of commands run before are reused.
+		With a telemetry.JobTelemetry, each command run is measured.
+		progress_callback is called with each progress.ProgressEvent, and on a
+		terminal one progress bar follows the whole run. A dry run prints a
+		script, which sets up and removes scratch, a scratch.Scratch.
+		'''
+		jobs = jobs or self.jobs
 		if not syntax:
 			return
 		debug( "Generated {} commands".format(len(syntax)) )
+		progress = None
+		if (not self.dry_run) and (progress_callback or sys.stderr.isatty()):
+			from .progress import Progress
+			progress = Progress(syntax, expected_seconds=self.expected_seconds,
+								callback=progress_callback, bar=sys.stderr.isatty())
+		def execute(line):
+			on_progress = (lambda event: progress.update(line, event)) if progress else None
+			return self.execute(line, telemetry=telemetry, on_progress=on_progress)
+		if segment_cache is not None:
+			execute = lambda line, execute=execute: self.execute_cached(line, segment_cache, execute)
+		if journal is not None:
+			execute = lambda line, execute=execute: self.execute_journaled(line, journal, execute)
+		if progress is not None:
+			def execute(line, execute=execute): # skipped commands count as done
+				result = execute(line)
+				success, _ = result
+				progress.finish(line, success)
+				return result
 		if (not self.dry_run):
-			for line in progress_bar(syntax, desc="{} arguments".format(len(syntax)), disable=not sys.stderr.isatty()):
-				debug( " ".join(line) )
-				proc = subprocess.Popen(line,
-							stdin=subprocess.DEVNULL,
-							stdout=subprocess.PIPE,
-							stderr=subprocess.PIPE)
-				yield self.parse_output(proc.communicate(), returncode=proc.returncode)
+			try:
+				if 1 < jobs and 1 < len(syntax):
+					yield from self.run_parallel(syntax, jobs=jobs, execute=execute)
+				else:
+					for line in syntax:
+						yield execute(line)
+			finally:
+				if progress:
+					progress.close()
 		elif syntax:
-			print('#! /usr/bin/env sh')
-			for line in syntax:
-				print(' '.join(shlex.quote(s) for s in line))
+			if journal is not None:
+				syntax = [ line for line in syntax if not journal.is_complete(line, self.get_outputs(line)) ]
+			if segment_cache is not None:
+				syntax = [ line for line in syntax if not segment_cache.contains(line, self.get_outputs(line)) ]
+			print_script(syntax, scratch=scratch)
+	def run_parallel(self, syntax, jobs, execute=None):
+		'''
+		Yields results in command order. Once a command fails, commands that
+		haven't started are cancelled and the ones already running are allowed
+		to finish.
+		'''
+		import concurrent.futures
+		debug( "Running up to {} commands at once".format(jobs) )
+		with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+			futures = [ executor.submit(execute or self.execute, line) for line in syntax ]
+			try:
+				for future in futures:
+					result = future.result()
+					yield result
+					success, _ = result
+					if not success:
+						break
+			finally:
+				for future in futures:
+					future.cancel()
+	def run_async(self, *args, journal=None, segment_cache=None, telemetry=None, progress_callback=None, **kwargs):
+		'''
+		Async generator counterpart of run(), also taking timeout= seconds for the
+		whole job. Journals, segment caches, telemetry and progress are not
+		supported.
+		'''
+		unsupported = [ name for name, value in [ ('journal', journal), ('segment_cache', segment_cache),
+												  ('telemetry', telemetry), ('progress_callback', progress_callback) ]
+						if value is not None ]
+		if unsupported:
+			raise SplitterException("run_async does not support "+', '.join(unsupported))
+		from .aio import run
+		return run(self, *args, **kwargs)
 	def __repr__(self):
 		return "<{}>".format(self.executable)
-
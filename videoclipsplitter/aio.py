@@ -0,0 +1,118 @@
+"""
+asyncio counterpart of ConverterBase.run(), for embedding in an event loop.
+
+	async for success, log in converter.run_async(filename, jobs=50, timeout=3600, **options):
+		...
+"""
+import asyncio
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from . import SplitterException, print_script
+from .scratch import Scratch
+from .streams import LineSplitter, chunk_size
+from .util import DuplicateFilter
+
+
+class ConverterTimeout(SplitterException):
+	pass
+
+
+async def _iter_lines(reader):
+	splitter = LineSplitter()
+	while True:
+		chunk = await reader.read(chunk_size)
+		if not chunk:
+			break
+		for b in splitter.feed(chunk):
+			yield b
+	for b in splitter.close():
+		yield b
+async def _read_lines(reader, prefix, parse_line):
+	duplicates = DuplicateFilter()
+	async for line in _iter_lines(reader):
+		for b in duplicates.feed(line):
+			parse_line(b, prefix=prefix)
+	for b in duplicates.close():
+		parse_line(b, prefix=prefix)
+async def follow(proc, parse_line):
+	'''
+	Feeds proc's stdout and stderr to parse_line(b, prefix=...) as lines arrive.
+	If parse_line raises, or this coroutine is cancelled, proc is killed.
+	'''
+	readers = [ asyncio.ensure_future(_read_lines(reader, prefix, parse_line))
+				for prefix, reader in [ ('STDOUT', proc.stdout), ('STDERR', proc.stderr) ] if reader ]
+	try:
+		await asyncio.gather(*readers)
+		return await proc.wait()
+	except BaseException:
+		for r in readers:
+			r.cancel()
+		if proc.returncode is None:
+			debug( "Killing process {}".format(proc.pid) )
+			proc.kill()
+			await proc.wait()
+		raise
+async def execute(converter, line):
+	if isinstance(line, tuple): # run in order, stopping at the first failure
+		for command in line:
+			result = await execute(converter, command)
+			success, _ = result
+			if not success:
+				break
+		return result
+	debug( " ".join(line) )
+	proc = await asyncio.create_subprocess_exec(*line,
+				stdin=asyncio.subprocess.DEVNULL,
+				stdout=asyncio.subprocess.PIPE,
+				stderr=asyncio.subprocess.PIPE)
+	returncode = await follow(proc, converter.parse_line)
+	return returncode == 0, []
+async def run(converter, *args, jobs=None, timeout=None, keep_scratch=False, **kwargs):
+	'''
+	Async generator yielding results in command order. Up to jobs commands run at
+	once. The first failure cancels the rest, and so does the whole job taking
+	more than timeout seconds.
+	'''
+	jobs = jobs or converter.jobs
+	with Scratch(keep=keep_scratch, dry_run=converter.dry_run) as scratch:
+		async for result in _run(converter, list(converter.get_commands(*args, scratch=scratch, **kwargs)), jobs, timeout, scratch):
+			yield result
+async def _run(converter, syntax, jobs, timeout, scratch=None):
+	if not syntax:
+		return
+	debug( "Generated {} commands".format(len(syntax)) )
+	if converter.dry_run:
+		print_script(syntax, scratch=scratch)
+		return
+	slots = asyncio.Semaphore(jobs)
+	async def limited(line):
+		async with slots:
+			return await execute(converter, line)
+	loop = asyncio.get_running_loop()
+	deadline = loop.time()+timeout if timeout else None
+	tasks = [ asyncio.ensure_future(limited(line)) for line in syntax ]
+	try:
+		for n, task in enumerate(tasks):
+			try:
+				result = await asyncio.wait_for(task, None if deadline is None else max(0, deadline-loop.time()))
+			except asyncio.TimeoutError:
+				raise ConverterTimeout("Timed out after {}s, with {} of {} commands done".format(timeout, n, len(tasks)))
+			yield result
+			success, _ = result
+			if not success:
+				break
+	finally:
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,180 @@
+"""
+Find cuts from the content of a video: black frames, silence, or scene changes.
+
+The file is divided into shards that begin on keyframes, and each shard is
+analyzed by its own ffprobe process, so long recordings use every core.
+Detections cut off by a shard edge are joined back together, and the result is
+a CutTable of the parts to keep:
+
+	splits = detect('movie.mkv', kinds=['black', 'silence'], jobs=8)
+"""
+import concurrent.futures
+import os
+import sys
+import threading
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from . import SplitterException
+from .choices import detect_choices
+from .cuttable import CutTable, OPEN, parse_ticks, ticks_per_second
+from .FFprobe import get_duration
+from .FFprobe_flat import lavfi_escape, lavfi_records
+from .keyframes import get_keyframes, snap
+
+
+class AnalysisException(SplitterException):
+	pass
+
+
+min_shard_length = 60. # seconds
+edge_tolerance = ticks_per_second//2 # how close to a shard edge a detection is joined
+
+
+def get_shards(filename, jobs, duration=None):
+	'''
+	Returns (start, end) times in seconds, dividing filename into up to jobs
+	parts that begin on keyframes. The last end is None.
+	'''
+	if duration is None:
+		duration = get_duration(filename).total_seconds()
+	n = max(1, min(jobs, int(duration//min_shard_length)))
+	if n == 1:
+		return [ (0., None) ]
+	keyframes = get_keyframes(filename)
+	edges = sorted(set( snap(duration*i/n, keyframes, 'previous') for i in range(1, n) ))
+	edges = [ t for t in edges if 0 < t < duration ]
+	return list(zip([ 0. ]+edges, edges+[ None ]))
+def get_graph(kind, filename, start, end, scene_threshold=0.4):
+	'''
+	Returns (filtergraph, -show_entries) for ffprobe to analyze one shard
+	'''
+	source = 'amovie' if 'silence' == kind else 'movie'
+	graph = '{}={}'.format(source, lavfi_escape(filename))
+	if start:
+		graph += ':seek_point={}'.format(start)
+	if end is not None:
+		graph += ',{}=end={}'.format('atrim' if 'silence' == kind else 'trim', end)
+	# minimum durations are applied after stitching, so that parts on either
+	# side of a shard edge are counted together
+	if 'black' == kind:
+		return graph+',blackdetect=d=0[out0]', 'frame_tags=lavfi.black_start,lavfi.black_end'
+	elif 'silence' == kind:
+		return graph+',silencedetect=d=0[out0]', 'frame_tags=lavfi.silence_start,lavfi.silence_end'
+	elif 'scene' == kind:
+		return graph+',select=gt(scene\\,{})[out0]'.format(scene_threshold), 'frame=pts_time'
+	raise AnalysisException("Detection must be one of {}, not {}".format(', '.join(detect_choices), kind))
+def analyze_shard(kind, filename, start, end, on_start=None, **kwargs):
+	'''
+	Returns a list of detected (start, end) ticks within one shard. An interval
+	still open at the end of the shard is closed there. Scene changes are
+	zero-length intervals. on_start is given the ffprobe process.
+	'''
+	graph, entries = get_graph(kind, filename, start, end, **kwargs)
+	shard_start = parse_ticks(repr(start))
+	shard_end = OPEN if end is None else parse_ticks(repr(end))
+	intervals = []
+	y = intervals.append
+	began = None
+	for index, fields in lavfi_records(graph, entries, on_start=on_start):
+		if 'scene' == kind:
+			if fields.get('pts_time', 'N/A') != 'N/A':
+				t = parse_ticks(fields['pts_time'])
+				y( (t, t) )
+			continue
+		t = fields.get('lavfi_{}_end'.format(kind))
+		if t is not None:
+			y( (shard_start if began is None else began, parse_ticks(t)) )
+			began = None
+		t = fields.get('lavfi_{}_start'.format(kind))
+		if t is not None:
+			began = max(shard_start, parse_ticks(t))
+	if began is not None:
+		y( (began, shard_end) )
+	return intervals
+def stitch(intervals, edges=()):
+	'''
+	Merges overlapping (start, end) intervals, and intervals that meet within
+	edge_tolerance of a shard edge
+	'''
+	merged = []
+	for b, e in sorted(intervals, key=lambda i: (i[0], (1<<62) if i[1] == OPEN else i[1])):
+		if merged:
+			last_b, last_e = merged[-1]
+			if last_e == OPEN:
+				continue
+			if b <= last_e or (last_e in edges and b-last_e <= edge_tolerance):
+				merged[-1] = (last_b, e if (e == OPEN or last_e < e) else last_e)
+				continue
+		merged.append( (b, e) )
+	return merged
+def detect(filename, kinds=('black',), jobs=None, min_duration=2., **kwargs):
+	'''
+	Returns a CutTable of the parts of filename between detected black or silent
+	intervals at least min_duration seconds long, and scene changes.
+	'''
+	for kind in kinds:
+		if kind not in detect_choices:
+			raise AnalysisException("Detection must be one of {}, not {}".format(', '.join(detect_choices), kind))
+	jobs = jobs or os.cpu_count() or 1
+	duration = get_duration(filename).total_seconds()
+	file_end = parse_ticks(repr(duration))
+	shards = get_shards(filename, jobs, duration=duration)
+	edges = set( parse_ticks(repr(e)) for _, e in shards if e is not None )
+	info( "Analyzing {} for {} in {} shards".format(filename, ', '.join(kinds), len(shards)) )
+	min_ticks = round(min_duration*ticks_per_second)
+	procs, lock = [], threading.Lock()
+	failed = False
+	def on_start(proc):
+		with lock:
+			procs.append(proc)
+			if failed: # started after another shard failed
+				proc.kill()
+	with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+		futures = { kind: [ executor.submit(analyze_shard, kind, filename, b, e, on_start=on_start, **kwargs) for b, e in shards ]
+					for kind in kinds }
+		found = []
+		try:
+			done, _ = concurrent.futures.wait([ f for fs in futures.values() for f in fs ],
+											return_when=concurrent.futures.FIRST_EXCEPTION)
+			for f in done: # raises the first failure without waiting on the rest
+				f.result()
+			for kind, fs in futures.items():
+				intervals = stitch([ i for f in fs for i in f.result() ], edges)
+				if 'scene' != kind:
+					intervals = [ (b, e) for b, e in intervals if min_ticks <= (file_end if e == OPEN else e)-b ]
+				debug( "{} {} detections in {}".format(len(intervals), kind, filename) )
+				found.extend(intervals)
+		except:
+			for fs in futures.values():
+				for f in fs:
+					f.cancel()
+			with lock:
+				failed = True
+				running = [ p for p in procs if p.poll() is None ]
+			for proc in running:
+				debug( "Killing process {}".format(proc.pid) )
+				proc.kill()
+			for proc in running:
+				proc.wait()
+			raise
+	starts, ends = [], []
+	t = 0
+	for b, e in stitch(found):
+		if t < b:
+			starts.append(t)
+			ends.append(b)
+		t = max(t, file_end if e == OPEN else e)
+	if t < file_end:
+		starts.append(t)
+		ends.append(OPEN)
+	return CutTable(starts, ends)
@@ -0,0 +1,152 @@
+#! /usr/bin/env python3
+"""
+Run many (video, cut list) jobs from one process.
+
+Jobs come from a manifest file of tab-separated lines:
+	video_filename	cut_list_filename
+or from directories, where each cut list is paired with the video of the same
+name, for example movie.avi with movie.avi.m3u or movie.m3u.
+"""
+import argparse
+import concurrent.futures
+import logging
+import os, os.path
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .cli import convert, parse_files
+
+
+cut_list_extensions = ( '.CUTLIST', '.M3U', '.SPLITS' )
+
+
+def is_cut_list(filename):
+	_, ext = os.path.splitext(filename)
+	return ext.upper() in cut_list_extensions
+def read_manifest(filename):
+	'''
+	Yields (video, cut list) pairs. Relative paths are relative to the manifest.
+	'''
+	dirname, _ = os.path.split(filename)
+	with open(filename) as fi:
+		for NR, line in enumerate(fi, start=1):
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			try:
+				video_filename, cuts_filename = line.split('\t')
+			except ValueError:
+				warning("{}:{}: expected 2 tab-separated filenames, ignored".format(filename, NR))
+				continue
+			yield os.path.join(dirname, video_filename), os.path.join(dirname, cuts_filename)
+def scan_directory(dirname):
+	'''
+	Yields (video, cut list) pairs for every cut list with a matching video in dirname
+	'''
+	names = sorted(os.listdir(dirname))
+	videos = {}
+	for name in names:
+		if not is_cut_list(name):
+			filepart, _ = os.path.splitext(name)
+			videos.setdefault(filepart, name)
+	for name in names:
+		if not is_cut_list(name):
+			continue
+		stem, _ = os.path.splitext(name)
+		if stem in names and not is_cut_list(stem):
+			video_name = stem
+		elif stem in videos:
+			video_name = videos[stem]
+		else:
+			warning("No video found for {}".format(os.path.join(dirname, name)))
+			continue
+		yield os.path.join(dirname, video_name), os.path.join(dirname, name)
+def get_jobs(*args):
+	for arg in args:
+		if os.path.isdir(arg):
+			yield from scan_directory(arg)
+		else:
+			yield from read_manifest(arg)
+
+
+def run_job(video_filename, cuts_filename, converter_names='', **options):
+	files, options_out = parse_files([video_filename, cuts_filename], **options)
+	return convert(files, converter_names=converter_names, **options_out)
+def run_batch(jobs, concurrency=None, **options):
+	'''
+	Runs (video, cut list) pairs through one pool of concurrency workers.
+	Returns the list of jobs that failed.
+	'''
+	jobs = list(jobs)
+	concurrency = concurrency or os.cpu_count() or 1
+	info( "{} jobs, {} at a time".format(len(jobs), concurrency) )
+	failures = []
+	with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+		futures = { executor.submit(run_job, *job, **options): job for job in jobs }
+		for future in concurrent.futures.as_completed(futures):
+			job = futures[future]
+			try:
+				if future.result():
+					continue
+				error( "All converters tried unsuccessfully on {}".format(job[0]) )
+			except Exception as e: # one bad job shouldn't stop the batch
+				error( "{} failed: {}".format(job[0], e) )
+			failures.append(job)
+	return failures
+
+
+def get_argparser():
+	from .choices import snap_choices
+	ap = argparse.ArgumentParser(description="Split many videos, each according to its own list of segments")
+	newarg = ap.add_mutually_exclusive_group().add_argument
+	newarg('--quiet', '-q', action='store_const', dest='logging_level', const=logging.ERROR)
+	newarg('--verbose', '-v', action='store_const', dest='logging_level', const=logging.INFO)
+	newarg = ap.add_argument_group('general options').add_argument
+	newarg('--concurrency', '-c', type=int, help="Run this many jobs at once (default: number of CPUs)")
+	newarg('--converters', '-C', help="Comma-seperated list of programs, tried in order")
+	newarg('--dry-run', '-n', action='store_true', help="Only show commands, do not run them")
+	newarg('--resume', action='store_true', help="Skip commands that completed in an earlier run of each job, if their outputs are unchanged")
+	newarg('--segment-cache', action='store_true', help="Reuse outputs of identical cuts from earlier runs")
+	newarg('--keep-scratch', action='store_true', help="Keep generated option files, scripts and intermediates for debugging, instead of removing them")
+	newarg('--telemetry', metavar='FILE', help="Append resources used by each command, and throughput of each job, to this JSON lines file")
+	newarg('--snap', choices=snap_choices, help="Move cuts onto the nearest, previous or next keyframe before converting")
+	newarg('--optimize', action='store_true', help="Drop empty cuts, clamp cuts to the end of the file, and merge overlapping or adjacent cuts")
+	newarg('sources', nargs='+', help='Manifest files or directories of videos and cut lists')
+	return ap
+def main(*args):
+	if args:
+		options_in = get_argparser().parse_args(args)
+	else:
+		options_in = get_argparser().parse_args()
+	debug("Command-line in: {}".format(options_in))
+	telemetry = None
+	if options_in.telemetry:
+		from .telemetry import Telemetry
+		telemetry = Telemetry(options_in.telemetry)
+	failures = run_batch(get_jobs(*options_in.sources),
+						 concurrency=options_in.concurrency,
+						 converter_names=options_in.converters,
+						 dry_run=options_in.dry_run,
+						 snap=options_in.snap,
+						 optimize=options_in.optimize,
+						 resume=options_in.resume,
+						 segment_cache=options_in.segment_cache,
+						 keep_scratch=options_in.keep_scratch,
+						 telemetry=telemetry)
+	if failures:
+		fatal( "{} jobs failed".format(len(failures)) )
+		return -1
+
+
+if '__main__' == __name__:
+	sys.exit(main())
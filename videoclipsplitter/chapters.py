@@ -7,7 +7,7 @@ CHAPTER${n}NAME=$name
 '''
 def make_chapters_file(chapters, filename):
 	t = string.Template(common_chapter_spec_element)
-	with open(chapters_filename, 'w') as cfo:
+	with open(filename, 'w') as cfo:
 		for n, (name, timestamp) in enumerate(chapters):
 			cfo.write(t.substitute(locals()))
 	return True
@@ -0,0 +1,7 @@
+"""
+Values the command-line options accept, kept apart from the modules that act
+on them so that building an argument parser imports nothing else.
+"""
+
+snap_choices = ( 'nearest', 'previous', 'next' ) # keyframes.snap_cuts
+detect_choices = [ 'black', 'silence', 'scene' ] # analysis.detect
@@ -1,5 +1,6 @@
 
 import argparse
+from decimal import Decimal
 import os, os.path
 import logging
 import subprocess
@@ -17,18 +18,19 @@ except:
 	debug = info = warning = fatal = error
 
 
-from .AsfBin		import AsfBinConverter,		probe as AsfBin_probe
-from .AviDemux		import AviDemuxConverter,	probe as AviDemux_probe
-from .FFmpeg		import FFmpegConverter,		probe as FFmpeg_probe
-from .gpac			import GpacConverter,		probe as Gpac_probe
-from .MkvMerge		import MkvMergeConverter,	probe as MkvMerge_probe
-
+from . import SplitterException
+from .registry		import get_backend, match_backends
+# analysis, journal, segment_cache, telemetry, keyframes, optimize, planner
+# and probing are imported where they're used, so a run only loads what its
+# options need
+from .cuttable		import CutTable
 from .m3u			import *	# VLC extended m3u file produced by Clipper.lua
 from .cutlist		import *	# intermediate Windows format
 from .splits_tsv	import *	# user-defined tab-separated file
 
 
 def get_argparser():
+	from .choices import detect_choices, snap_choices
 	ap = argparse.ArgumentParser(description="Transcode or convert a video from a list of segments")
 	newarg = ap.add_mutually_exclusive_group().add_argument
 	newarg('--quiet', '-q', action='store_const', dest='logging_level', const=logging.ERROR)
@@ -36,91 +38,126 @@ def get_argparser():
 	newarg = ap.add_argument_group('general options').add_argument
 	newarg('--converters', '-C', help="Comma-seperated list of programs, tried in order")
 	newarg('--dry-run', '-n', action='store_true', help="Only show commands, do not run them")
+	newarg('--jobs', '-j', type=int, default=1, help="Run up to this many commands at once, for converters that generate one command per cut")
 	newarg('--output', '-o', help="Write to filename (instead of automatic)")
-	newarg('files', nargs=2, help='2 files to parse')
+	newarg('--resume', action='store_true', help="Skip commands that completed in an earlier run of this job, if their outputs are unchanged")
+	newarg('--segment-cache', action='store_true', help="Reuse outputs of identical cuts from earlier runs, so an edited cut list only converts the cuts that changed")
+	newarg('--keep-scratch', action='store_true', help="Keep generated option files, scripts and intermediates for debugging, instead of removing them")
+	newarg('--telemetry', metavar='FILE', help="Append time, CPU, memory and I/O used by each command, and throughput of each job, to this JSON lines file")
+	newarg('--strategy', choices=['auto', 'segment', 'ranges', 'seek', 'smart'], help="How ffmpeg cuts: one pass through the segment muxer, one pass writing only the cuts, one seeking process per cut, re-encoding only up to the first keyframe of each cut, or auto to choose between segment and seek")
+	newarg('--snap', choices=snap_choices, help="Move cuts onto the nearest, previous or next keyframe before converting")
+	newarg('--optimize', action='store_true', help="Drop empty cuts, clamp cuts to the end of the file, and merge overlapping or adjacent cuts")
+	newarg('--batch-gap', type=float, metavar='SECONDS', help="With --strategy seek, cuts less than this far apart share one ffmpeg process, each still written to its own file")
+	newarg('--detect', metavar='KINDS', help="Instead of a cut list, keep the parts between any of these comma-separated detections: "+', '.join(detect_choices))
+	newarg('--detect-duration', type=float, default=2., metavar='SECONDS', help="With --detect, ignore black or silence shorter than this")
+	newarg('files', nargs='+', help='2 files to parse, or 1 with --detect')
 	return ap
 
 
 def get_probes(*args):
-	probes = []
-	y = probes.append
-	if MkvMergeConverter.match_filenames(*args):
-		y( ('mkvmerge',		MkvMerge_probe) )
-	if GpacConverter.match_filenames(*args):
-		y( ('MP4Box',		Gpac_probe) )
-	if FFmpegConverter.match_filenames(*args):
-		y( ('ffmpeg',		FFmpeg_probe) )
-	#if AviDemuxConverter.match_filenames(*args):
-	#	y( ('avidemux',		AviDemux_probe) )
-	if AsfBinConverter.match_filenames(*args):
-		y( ('asfbin',		AsfBin_probe) )
-	return probes
+	return [ (b.name, b.probe) for b in match_backends(*args) if b.can_probe ]
 def get_converters(*args, **kwargs):
-	converters = []
-	y = converters.append
-	if MkvMergeConverter.match_filenames(*args):
-		y( ('mkvmerge',		MkvMergeConverter(**kwargs)) )
-	if GpacConverter.match_filenames(*args):
-		y( ('MP4Box',		GpacConverter(**kwargs)) )
-	if FFmpegConverter.match_filenames(*args):
-		y( ('ffmpeg',		FFmpegConverter(**kwargs)) )
-	if AviDemuxConverter.match_filenames(*args):
-		y( ('avidemux',		AviDemuxConverter(**kwargs)) )
-	if AsfBinConverter.match_filenames(*args):
-		y( ('asfbin',		AsfBinConverter(**kwargs)) )
-	return converters
-def main(*args):
-	if args:
-		options_in = get_argparser().parse_args(args) # returns a Namespace
-	else:
-		options_in = get_argparser().parse_args()
-	debug("Command-line in: {}".format(options_in))
-	options_out = { 'dry_run': options_in.dry_run }
-	if options_in.output:
-		options_out['output_filename'] = options_in.output
+	return [ (b.name, b.converter(**kwargs)) for b in match_backends(*args) ]
+def get_named_converters(names, **kwargs):
+	cs = []
+	y = cs.append
+	for text in names.split(','):
+		b = get_backend(text)
+		if b:
+			y( (b.name, b.converter(**kwargs)) )
+		else:
+			warning( "Unknown converter {}".format(text.strip()) )
+	return cs
+def get_m3u_end(cut):
+	'''
+	An m3u cut without a stop-time has an end of 0, or the #EXTINF duration,
+	which is -1 when unknown. Both mean the end of the file.
+	'''
+	try:
+		return cut.end if 0 < Decimal(cut.end) else None
+	except (TypeError, ArithmeticError):
+		return None
+def parse_files(filenames, **options):
+	'''
+	Returns the media files and the converter options loaded from any cut lists among filenames
+	'''
 	files = []
-	#assert len(options_in.files) == 2
-	for fn in options_in.files:
+	options_out = dict(options)
+	for fn in filenames:
 		if not os.path.isfile(fn):
 			raise SplitterException("{} not found".format(fn))
 		_, ext = os.path.splitext(fn)
 		ext = ext.upper()
 		if '.CUTLIST' == ext:
-			options_out['splits'] = [ (cut.start, cut.end) for cut in cutlist(fn).cuts ]
+			options_out['splits'] = CutTable.from_pairs((cut.start, cut.end) for cut in iter_cutlist(fn))
 			options_out['cut_units'] = 'seconds' # decimal
 		elif '.M3U' == ext:
-			options_out['splits'] = [ (cut.start, cut.end) for cut in extended_m3u_file(fn) ]
+			options_out['splits'] = CutTable.from_pairs((cut.start, get_m3u_end(cut)) for cut in iter_extended_m3u_file(fn))
 			options_out['cut_units'] = 'seconds' # decimal
 		elif '.SPLITS' == ext:
-			options_out['frames'] = old_splits_file(fn).cuts
+			options_out['frames'] = CutTable.from_pairs(iter_splits_file(fn), units='frames')
 			options_out['cut_units'] = 'frames'
 		else:
 			files.append(fn)
-	debug("Command-line out: {}".format(options_out))
-	if options_in.converters:
-		cs = []
-		y = cs.append
-		for text in options_in.converters.split(','):
-			cname = text.strip().upper()
-			if   'MKVMERGE' == cname:
-				y( ('mkvmerge',		MkvMergeConverter(**options_out)) )
-			elif 'MP4BOX' == cname:
-				y( ('MP4Box',		GpacConverter(**options_out)) )
-			elif 'FFMPEG' == cname:
-				y( ('ffmpeg',		FFmpegConverter(**options_out)) )
-			elif 'AVIDEMUX' == cname:
-				y( ('avidemux',		AviDemuxConverter(**options_out)) )
-			elif 'ASFBIN' == cname:
-				y( ('asfbin',		AsfBinConverter(**options_out)) )
+			continue
+		table = options_out['splits' if 'splits' in options_out else 'frames']
+		for n, problem in table.validate():
+			warning("{}: cut {} {}".format(fn, n+1, problem))
+	return files, options_out
+def convert(files, converter_names='', snap='', optimize=False, resume=False, segment_cache=False, telemetry=None, **options_out):
+	'''
+	Tries each eligible converter in turn until one succeeds, cheapest first
+	unless converter_names gives the order. Returns True on success.
+	telemetry is a telemetry.Telemetry, whose earlier jobs inform the plan.
+	'''
+	if snap and files:
+		from .keyframes import snap_cuts
+		snap_cuts(files[0], options_out, how=snap)
+	if optimize and files: # after snapping, which can make cuts touch
+		from .optimize import optimize_cuts
+		optimize_cuts(files[0], options_out)
+	if converter_names:
+		cs = get_named_converters(converter_names, **options_out)
 	else:
 		cs = get_converters(*files, **options_out)
+	if not options_out.get('dry_run'):
+		usable = []
+		for cname, cobj in cs:
+			reason = cobj.check_tool(**options_out)
+			if reason:
+				info( "Skipping {}: {}".format(cname, reason) )
+			else:
+				usable.append( (cname, cobj) )
+		cs = usable
+	if files and not converter_names:
+		from .planner import History, plan, print_plan
+		estimates = plan(cs, files[0], options_out, history=History(telemetry.filename if telemetry else None))
+		cs = [ (e.name, e.converter) for e in estimates ]
+		if options_out.get('dry_run'):
+			print_plan(estimates, files[0])
+		else:
+			for e in estimates:
+				debug( "{}: estimated {:.2f}s".format(e.name, e.seconds) )
+	journal = None
+	if resume and files:
+		from .journal import Journal
+		journal = Journal.for_job(files[0])
+	if segment_cache and files:
+		from .segment_cache import SegmentCache
+		segment_cache = SegmentCache(files[0])
+	else:
+		segment_cache = None
 	debug( "{} possible converters:".format(len(cs)) )
 	for cname, cobj in cs:
 		debug( "{} at {}".format(cname, cobj.executable) )
 	for cname, cobj in cs:
 		info( "Running converter "+cname )
+		job = None
+		if telemetry and files and not options_out.get('dry_run'):
+			from .planner import get_bytes_read
+			job = telemetry.job(cname, files[0], bytes_read=get_bytes_read(cobj, files[0], options_out)[0])
 		successes = total = 0
-		for success, log in cobj.run(*files, **options_out):
+		for success, log in cobj.run(*files, journal=journal, segment_cache=segment_cache, telemetry=job, **options_out):
 			# this section won't run during dry_run
 			total += 1
 			if success:
@@ -129,19 +166,68 @@ def main(*args):
 				error( cname+" failed" )
 				break
 		else:
-			break
+			if job:
+				job.finish(True)
+			return True
+		if job:
+			job.finish(False)
 		info( "{}/{} completed".format(successes, total) )
+	return False
+def main(*args):
+	ap = get_argparser()
+	if args:
+		options_in = ap.parse_args(args) # returns a Namespace
 	else:
+		options_in = ap.parse_args()
+	debug("Command-line in: {}".format(options_in))
+	if len(options_in.files) != (1 if options_in.detect else 2):
+		ap.error("expected a video and a cut list, or a video with --detect")
+	options_out = { 'dry_run': options_in.dry_run }
+	if 1 < options_in.jobs:
+		options_out['jobs'] = options_in.jobs
+	if options_in.output:
+		options_out['output_filename'] = options_in.output
+	if options_in.strategy:
+		options_out['strategy'] = options_in.strategy
+	if options_in.batch_gap:
+		options_out['batch_gap'] = options_in.batch_gap
+	if options_in.keep_scratch:
+		options_out['keep_scratch'] = True
+	#assert len(options_in.files) == 2
+	files, options_out = parse_files(options_in.files, **options_out)
+	if options_in.detect:
+		from .analysis import detect
+		kinds = [ k.strip() for k in options_in.detect.split(',') ]
+		options_out['splits'] = detect(files[0], kinds=kinds,
+									   jobs=options_in.jobs if 1 < options_in.jobs else None,
+									   min_duration=options_in.detect_duration)
+		options_out['cut_units'] = 'seconds'
+	debug("Command-line out: {}".format(options_out))
+	telemetry = None
+	if options_in.telemetry:
+		from .telemetry import Telemetry
+		telemetry = Telemetry(options_in.telemetry)
+	if not convert(files, converter_names=options_in.converters, snap=options_in.snap,
+				   optimize=options_in.optimize,
+				   resume=options_in.resume, segment_cache=options_in.segment_cache,
+				   telemetry=telemetry, **options_out):
 		fatal( "All converters tried unsuccessfully" )
 		return -1
-def probe(*args, **kwargs):
+def probe(*args, jobs=None, **kwargs):
+	'''
+	Prints whether each backend accepts all of the files, probing them
+	concurrently. Returns { backend name: True or False }.
+	'''
+	from .probing import ProbeEngine
 	files = args
-	ps = get_probes(*files, **kwargs)
-	assert ps
-	debug( "{} probes:".format(len(ps)) )
-	for cname, f in ps:
-		debug( "{} at {}".format(cname, f) )
-	for cname, f in ps:
-		result=("Pass" if f(*files) else "Fail")
-		print("{}:\t{}".format(cname, result))
+	backends = [ b for b in match_backends(*files) if b.can_probe ]
+	assert backends
+	debug( "{} probes: {}".format(len(backends), ', '.join(b.name for b in backends)) )
+	verdicts = ProbeEngine(jobs=jobs, **kwargs).run(backends, files)
+	for b in backends:
+		print("{}:\t{}".format(b.name, "Pass" if verdicts[b.name] else "Fail"))
+	return verdicts
+
 
+if '__main__' == __name__:
+	sys.exit(main())
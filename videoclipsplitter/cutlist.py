@@ -1,7 +1,21 @@
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+import configparser
 from configparser import ConfigParser
+import sys
 
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from . import SplitterException
 from .namespace import Namespace
 
 
@@ -47,3 +61,33 @@ def cutlist(filename, **kwargs):
 	c = CutListParser(**kwargs)
 	c.read(filename)
 	return c
+def iter_cutlist(filename, cut_factory=Cut):
+	'''
+	Yields each Cut in order. The file is read by ConfigParser, so keys may use
+	':' as well as '=', values may continue on indented lines, and comments may
+	follow a value after ' ;'. Cut filenames come from [General] ApplyToFile.
+	'''
+	parser = CutListParser(strict=False, interpolation=None, inline_comment_prefixes=(';',))
+	try:
+		with open(filename) as fi:
+			parser.read_file(fi)
+	except configparser.Error as e:
+		raise SplitterException("{} is not a readable cut list: {}".format(filename, e))
+	video_filename = parser.get('General', 'ApplyToFile', fallback='').strip() or None
+	order = 0
+	for section in parser.cut_sections:
+		values = parser[section]
+		try:
+			cut = cut_factory(
+				start=Decimal(values['start']),
+				duration=Decimal(values['duration']),
+				filename=video_filename,
+				order=order)
+		except KeyError as e:
+			warning("{}: [{}] ignored, missing {}".format(filename, section, e))
+			continue
+		except InvalidOperation:
+			warning("{}: [{}] ignored, Start={} Duration={}".format(filename, section, values['start'], values['duration']))
+			continue
+		yield cut
+		order += 1
@@ -0,0 +1,129 @@
+"""
+Columnar cut list: parallel arrays of integer start and end ticks.
+
+For units='seconds' a tick is a microsecond, for units='frames' it's a frame.
+Times are parsed once, on the way in. Iterating a CutTable yields (start, end)
+pairs in the form the converters already take: Decimal seconds or int
+frames, with None for an open end. So a CutTable can be passed as splits= or
+frames= to any converter.
+"""
+from array import array
+from decimal import Decimal
+from fractions import Fraction
+
+
+ticks_per_second = 1000000
+one_second = Decimal(ticks_per_second)
+OPEN = -1 # an end that runs to the end of the file
+
+
+def parse_ticks(t, units='seconds'):
+	'''
+	Parses one start or end, as found in cut list files, to ticks
+	'''
+	if t is None or t == '':
+		return OPEN
+	if 'frames' == units:
+		return int(t)
+	return int(Decimal(t).scaleb(6).to_integral_value())
+
+
+class CutTable:
+	def __init__(self, starts=(), ends=(), units='seconds'):
+		if units not in ('seconds', 'frames'):
+			raise ValueError("units must be seconds or frames, not {}".format(units))
+		self.units = units
+		self.starts = array('q', starts)
+		self.ends = array('q', ends)
+		if len(self.starts) != len(self.ends):
+			raise ValueError("{} starts but {} ends".format(len(self.starts), len(self.ends)))
+	@classmethod
+	def from_pairs(cls, pairs, units='seconds'):
+		starts, ends = array('q'), array('q')
+		for b, e in pairs:
+			b = parse_ticks(b, units)
+			starts.append(0 if b == OPEN else b)
+			ends.append(parse_ticks(e, units))
+		return cls(starts, ends, units=units)
+	def __len__(self):
+		return len(self.starts)
+	def __iter__(self):
+		if 'frames' == self.units:
+			for b, e in zip(self.starts, self.ends):
+				yield b, (None if e == OPEN else e)
+		else:
+			for b, e in zip(self.starts, self.ends):
+				yield Decimal(b)/one_second, (None if e == OPEN else Decimal(e)/one_second)
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return CutTable(self.starts[i], self.ends[i], units=self.units)
+		return next(iter(CutTable([ self.starts[i] ], [ self.ends[i] ], units=self.units)))
+	def __eq__(self, other):
+		return isinstance(other, CutTable) and (self.units, self.starts, self.ends) == (other.units, other.starts, other.ends)
+	def __repr__(self):
+		return "<CutTable of {} cuts in {}>".format(len(self), self.units)
+	def copy(self):
+		return CutTable(self.starts, self.ends, units=self.units)
+
+	def sort(self):
+		'''
+		Sorts in place by start, then end
+		'''
+		order = sorted(range(len(self)), key=lambda i: (self.starts[i], self.ends[i] if self.ends[i] != OPEN else 1<<62))
+		self.starts = array('q', (self.starts[i] for i in order))
+		self.ends = array('q', (self.ends[i] for i in order))
+		return self
+	def durations(self, file_end=OPEN):
+		'''
+		Returns an array of durations in ticks. Open ends need file_end, otherwise
+		their duration is OPEN.
+		'''
+		return array('q', ( (file_end if e == OPEN else e)-b if (e != OPEN or file_end != OPEN) else OPEN
+							for b, e in zip(self.starts, self.ends) ))
+	def validate(self):
+		'''
+		Returns a list of (index, problem) for inverted, empty or overlapping cuts
+		'''
+		problems = []
+		y = problems.append
+		last_end = None
+		for i, (b, e) in enumerate(zip(self.starts, self.ends)):
+			if b < 0:
+				y( (i, "negative start") )
+			if e != OPEN and e < b:
+				y( (i, "ends before it starts") )
+			elif e == b:
+				y( (i, "zero length") )
+			if last_end is not None and (last_end == OPEN or b < last_end):
+				y( (i, "overlaps the previous cut") )
+			last_end = e
+		return problems
+	def offset(self, ticks):
+		'''
+		Returns a new table shifted by ticks, with starts clamped at 0
+		'''
+		return CutTable(array('q', (max(0, b+ticks) for b in self.starts)),
+						array('q', (e if e == OPEN else max(0, e+ticks) for e in self.ends)),
+						units=self.units)
+	def to_frames(self, fps):
+		'''
+		Returns a new table of frame numbers, rounding to the nearest frame
+		'''
+		if 'frames' == self.units:
+			return self.copy()
+		fps = Fraction(fps)
+		n, d = fps.numerator, fps.denominator*ticks_per_second
+		def f(t):
+			return t if t == OPEN else (2*t*n+d)//(2*d)
+		return CutTable(array('q', map(f, self.starts)), array('q', map(f, self.ends)), units='frames')
+	def to_seconds(self, fps):
+		'''
+		Returns a new table of seconds, from frame numbers at fps
+		'''
+		if 'seconds' == self.units:
+			return self.copy()
+		fps = Fraction(fps)
+		n, d = fps.denominator*ticks_per_second, fps.numerator
+		def s(f):
+			return f if f == OPEN else (2*f*n+d)//(2*d)
+		return CutTable(array('q', map(s, self.starts)), array('q', map(s, self.ends)), units='seconds')
@@ -0,0 +1,114 @@
+"""
+Where each external program is, and what it can do.
+
+An executable can be overridden with an environment variable, for example
+VIDEOCLIPSPLITTER_FFMPEG=/opt/ffmpeg/bin/ffmpeg. Each program found is run
+once to learn its version and capabilities, and the results are kept in the
+probe cache keyed by the executable file, so an upgrade is noticed.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+default_names = {
+	'asfbin':		( 'asfbin',			'ASFBIN.EXE' ),
+	'avidemux':		( 'avidemux3_cli',	'AVIDEMUX.EXE' ),
+	'ffmpeg':		( 'ffmpeg',			'FFMPEG.EXE' ),
+	'ffprobe':		( 'ffprobe',		'FFPROBE.EXE' ),
+	'mkvmerge':		( 'mkvmerge',		'MKVMERGE.EXE' ),
+	'MP4Box':		( 'MP4Box',			'MP4BOX.EXE' ) }
+
+# tool: [ (capability, arguments, text expected in the output), ... ]
+# the first entry's arguments also give the version
+capability_probes = {
+	'asfbin':		[ ('asfbin',			['-h'],							'ASFBIN') ],
+	'avidemux':		[ ('avidemux',			['--help'],						'--run') ],
+	'ffmpeg':		[ ('ffmpeg',			['-version'],					'ffmpeg version'),
+					  ('segment_frames',	['-hide_banner', '-h', 'muxer=segment'],	'segment_frames'),
+					  ('progress',			['-hide_banner', '-h', 'long'],	'-progress') ],
+	'ffprobe':		[ ('ffprobe',			['-version'],					'ffprobe version') ],
+	'mkvmerge':		[ ('mkvmerge',			['--version'],					'mkvmerge v') ],
+	'MP4Box':		[ ('MP4Box',			['-version'],					'version') ] }
+probe_timeout = 30
+
+
+class Tool:
+	def __init__(self, name, path, version='', capabilities=()):
+		self.name, self.path, self.version = name, path, version
+		self.capabilities = set(capabilities)
+	def __repr__(self):
+		return "<{} {} at {}: {}>".format(self.name, self.version, self.path, ', '.join(sorted(self.capabilities)))
+
+
+def get_executable(tool):
+	'''
+	Returns the configured command for tool, which is not necessarily on PATH
+	'''
+	unix_name, windows_name = default_names[tool]
+	return os.environ.get('VIDEOCLIPSPLITTER_'+tool.upper()) \
+		or (windows_name if sys.platform.startswith('win') else unix_name)
+def parse_version(text):
+	m = re.search(r'\bv?(\d+(?:\.\d+)+)', text)
+	return tuple(int(p) for p in m.group(1).split('.')) if m else ()
+def run_probes(tool, path):
+	version, capabilities = '', []
+	for n, (capability, args, expected) in enumerate(capability_probes.get(tool, [])):
+		try:
+			proc = subprocess.run([ path ]+args,
+				stdin=subprocess.DEVNULL,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.STDOUT,
+				timeout=probe_timeout)
+		except (OSError, subprocess.TimeoutExpired) as e:
+			warning( "{} {}: {}".format(path, ' '.join(args), e) )
+			continue
+		text = proc.stdout.decode('UTF-8', 'replace')
+		if not n:
+			version = text.strip().splitlines()[0] if text.strip() else ''
+		if expected in text:
+			capabilities.append(capability)
+	if 'mkvmerge' == tool and (9, 1) <= parse_version(version):
+		capabilities.append('parts-frames') # new in MKVToolNix 9.1
+	return version, capabilities
+
+
+_tools = {}
+def discover(tool, executable=None, use_cache=True):
+	'''
+	Returns a Tool, or None if the executable isn't found
+	'''
+	from .probe_cache import get_cache
+	executable = executable or get_executable(tool)
+	if (tool, executable) in _tools:
+		return _tools[(tool, executable)]
+	path = shutil.which(executable)
+	if not path:
+		debug( "{} not found".format(executable) )
+		_tools[(tool, executable)] = None
+		return None
+	cache = get_cache() if use_cache else None
+	b = cache.get(path, kind='tool:'+tool) if cache else None
+	if b:
+		version, capabilities = json.loads(b.decode('UTF-8'))
+	else:
+		version, capabilities = run_probes(tool, path)
+		if cache:
+			cache.put(path, json.dumps([version, capabilities]).encode('UTF-8'), kind='tool:'+tool)
+	t = _tools[(tool, executable)] = Tool(tool, path, version, capabilities)
+	debug( repr(t) )
+	return t
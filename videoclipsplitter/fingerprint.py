@@ -0,0 +1,73 @@
+"""
+Cheap file identity for the caches and journals.
+
+By default a file is identified by its size and a hash of sampled blocks: the
+head, the tail, and evenly spaced blocks between, read through mmap. That
+takes milliseconds regardless of size and still notices a truncated,
+re-encoded or replaced recording. full=True hashes everything, streaming with
+large page-aligned reads. Results are remembered per (device, inode, size,
+mtime) for the life of the process.
+"""
+import hashlib
+import mmap
+import os
+import sys
+import threading
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+sample_size = 1<<16
+stride_samples = 16 # between the head and the tail
+full_read_size = 1<<23 # a multiple of the page size
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _hash_sampled(fileobj, size, h):
+	if size <= (stride_samples+2)*sample_size: # small enough to read whole
+		h.update(fileobj.read())
+		return
+	last = size-sample_size
+	offsets = [ 0 ]+[ last*k//(stride_samples+1) for k in range(1, stride_samples+1) ]+[ last ]
+	with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as m:
+		for offset in offsets:
+			h.update(m[offset:offset+sample_size])
+def _hash_full(fileobj, size, h):
+	if hasattr(os, 'posix_fadvise'):
+		os.posix_fadvise(fileobj.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+	buf = bytearray(full_read_size)
+	view = memoryview(buf)
+	while True:
+		n = fileobj.readinto(buf)
+		if not n:
+			break
+		h.update(view[:n])
+def fingerprint(filename, full=False):
+	'''
+	Returns a str identifying the contents of filename, like '1f4a3c-9b1e...'
+	(size in hex, then the hash)
+	'''
+	st = os.stat(filename)
+	memo_key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, full)
+	with _memo_lock:
+		if memo_key in _memo:
+			return _memo[memo_key]
+	h = hashlib.blake2b(digest_size=20)
+	h.update(str(st.st_size).encode('ASCII'))
+	with open(filename, 'rb', buffering=0) as fi:
+		(_hash_full if full else _hash_sampled)(fi, st.st_size, h)
+	value = '{:x}-{}'.format(st.st_size, h.hexdigest())
+	with _memo_lock:
+		_memo[memo_key] = value
+	return value
@@ -16,8 +16,10 @@ except:
 	debug = info = warning = fatal = error
 
 from . import ConverterBase, SplitterException, progress_bar, stream_encoding
+from .discovery import get_executable
 from .chapters import make_chapters_file
-from .FFprobe import get_frame_rate
+from .cuttable import CutTable
+from .FFprobe import require_frame_rate
 
 
 class GpacException(SplitterException):
@@ -43,6 +45,7 @@ def probe(*args):
 			return False
 	return True
 class GpacConverter(ConverterBase):
+	tool = 'MP4Box'
 	can_chapter = True
 	can_split = True
 	@staticmethod
@@ -62,13 +65,11 @@ class GpacConverter(ConverterBase):
 		return True
 	def __init__(self, **kwargs):
 		self.dry_run = kwargs.pop('dry_run', None)
-		if sys.platform.startswith('win'):
-			self.executable = 'MP4BOX.EXE'
-		else:
-			self.executable = 'MP4Box'
+		self.executable = get_executable(self.tool)
 		self.extra_options = kwargs
 	def get_commands(self, input_filename,
 					 output_filename='',
+					 scratch=None,
 					 **kwargs):
 		options = kwargs
 		self.check_filenames(input_filename)
@@ -78,9 +79,12 @@ class GpacConverter(ConverterBase):
 		if 'splits' in options:
 			splits = options.pop('splits')
 		elif 'frames' in options:
-			fps = get_frame_rate(input_filename)
-			debug( "Converting frame cuts to decimal second cuts at {:.2f} fps".format(fps) )
-			splits = [ (int(b)/fps if b else '', int(e)/fps if e else '') for (b, e) in options.pop('frames') ]
+			fps = require_frame_rate(input_filename, GpacException)
+			debug( "Converting frame cuts to decimal second cuts at {:.2f} fps".format(float(fps)) )
+			frames = options.pop('frames')
+			if not isinstance(frames, CutTable):
+				frames = CutTable.from_pairs(frames, units='frames')
+			splits = frames.to_seconds(fps)
 		elif 'chapters' in options: # these are pairs
 			output_filename = output_filename or '{filepart}_Chapters.MP4'
 			chapters_filename = options.pop('chapters_filename', '{basename}.chapters')
@@ -88,6 +92,8 @@ class GpacConverter(ConverterBase):
 				chapters_filename = chapters_filename.format(**locals())
 			except:
 				warning("chapters_filename={}, which is probably not what you intended".format(chapters_filename))
+			if scratch:
+				chapters_filename = scratch.path(chapters_filename)
 			if make_chapters_file(options.pop('chapters'), chapters_filename):
 				syntax += [ '-chap', chapters_filename ]
 				syntax += [ '-add-item', chapters_filename ]
@@ -106,11 +112,22 @@ class GpacConverter(ConverterBase):
 				yield [ self.executable, '-cat', input_filename ]+syntax_part+[ '-new', my_filename ]
 		else:
 			yield [ self.executable, '-cat', input_filename ]+syntax+[ '-new', output_filename ]
+	def get_reads(self, input_source, cuts, duration, **kwargs):
+		'''
+		-split-chunk takes one range, so each cut is its own process
+		'''
+		if 'splits' in kwargs or 'frames' in kwargs:
+			return [ (b, e or duration) for (b, e) in cuts ]
+		return [ (0., duration) ]
+	def get_outputs(self, command):
+		return [ command[i+1] for i, arg in enumerate(command[:-1]) if '-new' == arg ]
 	def parse_output(self, streams, **kwargs):
 		_, stderr_contents = streams
 		for b in stderr_contents.split(b'\n'):
 			parse_line(b, prefix='STDERR')
 		return kwargs.pop('returncode', 0) == 0, []
+	def parse_line(self, b, prefix='STDOUT'):
+		return parse_line(b, prefix=prefix)
 def parse_line(b,
 			   prefix='STDOUT',
 			   progress=print if sys.stdout.isatty() else (lambda x: None),
@@ -118,16 +135,10 @@ def parse_line(b,
 	line = b.decode(encoding).rstrip()
 	if not line:
 		return
-	#if line.endswith('100)'):
-	if  '\r' in line:
-		_, lline = line.rsplit('\r', 1)
-		for p in [ 'Appending:', 'ISO File Writing:', 'Splitting:' ]:
-			if lline.startswith(p):
-				progress(lline)
-				break
-		else:
-			debug(prefix+' '+lline)
-	return
+	for p in [ 'Appending:', 'ISO File Writing:', 'Splitting:' ]:
+		if line.startswith(p):
+			progress(line)
+			return
 	for s in ['Bad Parameter', 'No suitable media tracks to cat']:
 		if s in line:
 			raise GpacException(line)
@@ -136,10 +147,7 @@ def parse_line(b,
 	else:
 		debug(prefix+' '+line)
 ###
-if sys.platform.startswith('win'):
-	mp4box_executable = 'MP4BOX.EXE'
-else:
-	mp4box_executable = 'MP4Box'
+mp4box_executable = get_executable('MP4Box')
 debug("MP4Box is {}".format(mp4box_executable))
 def MP4Box_command(input_filename,
 				   output_filename='{filepart}_Cut.MP4',
@@ -0,0 +1,139 @@
+"""
+Per-job record of completed commands, so an interrupted job can be resumed.
+
+Each job (an input file, run from a working directory) has a JSON lines file
+in the cache directory. A line is written as each command succeeds, listing
+its outputs with their sizes and fingerprints. When the job is run again, a
+command whose outputs are all still present and unchanged is skipped.
+
+Commands are compared by their arguments, and small files named in them, like
+MkvMerge option files and AviDemux scripts, by their contents. If the input
+file itself changes, the journal starts over.
+"""
+import glob
+import hashlib
+import json
+import os, os.path
+import re
+import sys
+import threading
+import time
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .fingerprint import fingerprint
+from .probe_cache import cache_dir
+from .scratch import is_intermediate, normalize
+
+
+journal_dir = os.path.join(cache_dir, 'journals')
+max_argument_file_size = 1<<20 # larger files named in commands are left out of the key
+
+
+def expand_outputs(outputs):
+	'''
+	Replaces printf-style patterns like name-%03d.mkv with the files that match
+	'''
+	filenames = []
+	for fn in outputs:
+		if '%' in fn:
+			pattern = re.sub(r'%0?(\d*)d', lambda m: '[0-9]'*int(m.group(1)) if m.group(1) else '*', glob.escape(fn))
+			filenames.extend(sorted(glob.glob(pattern)))
+		else:
+			filenames.append(fn)
+	return filenames
+def command_key(line, outputs=()):
+	'''
+	Returns a str that changes when the command, or any small file it reads,
+	changes. Scratch directories are left out, since they differ every run.
+	'''
+	commands = line if isinstance(line, tuple) else (line,)
+	h = hashlib.sha1(normalize(json.dumps(commands)).encode('UTF-8'))
+	for command in commands:
+		for arg in command[1:]:
+			fn = arg[1:] if arg.startswith('@') else arg
+			if fn in outputs or is_intermediate(fn):
+				continue
+			try:
+				if os.path.isfile(fn) and os.path.getsize(fn) <= max_argument_file_size:
+					with open(fn, 'rb') as fi:
+						h.update(normalize(fi.read()))
+			except (OSError, ValueError):
+				pass
+	return h.hexdigest()
+
+
+class Journal:
+	def __init__(self, filename, input_filename):
+		self.filename = filename
+		self.lock = threading.Lock()
+		self.completed = {}
+		header = { 'input': os.path.realpath(input_filename), 'fingerprint': fingerprint(input_filename) }
+		if os.path.exists(filename):
+			with open(filename) as fi:
+				lines = iter(fi)
+				try:
+					found = json.loads(next(lines))
+				except (StopIteration, ValueError):
+					found = None
+				if found == header:
+					for NR, line in enumerate(lines, start=2):
+						try:
+							entry = json.loads(line)
+						except ValueError: # a line cut short by a crash
+							debug( "{}:{}: unreadable, ignored".format(filename, NR) )
+							continue
+						self.completed[entry['key']] = entry
+				else:
+					info( "{} changed since {} was written, starting over".format(input_filename, filename) )
+			debug( "{} completed commands in {}".format(len(self.completed), filename) )
+		if not self.completed:
+			dirname, _ = os.path.split(filename)
+			os.makedirs(dirname, exist_ok=True)
+			with open(filename, 'w') as ofo:
+				ofo.write(json.dumps(header)+'\n')
+	@classmethod
+	def for_job(cls, input_filename, cwd=None):
+		'''
+		Returns the Journal for input_filename run from cwd
+		'''
+		job = os.path.realpath(input_filename)+'\0'+os.path.realpath(cwd or os.getcwd())
+		return cls(os.path.join(journal_dir, hashlib.sha1(job.encode('UTF-8')).hexdigest()+'.jsonl'), input_filename)
+	def is_complete(self, line, outputs):
+		'''
+		True if line was recorded as completed, and each of its outputs is still
+		the same size and fingerprint
+		'''
+		entry = self.completed.get(command_key(line, outputs))
+		if not entry or not entry['outputs']:
+			return False
+		for output in entry['outputs']:
+			fn = output['path']
+			if not os.path.isfile(fn) or os.path.getsize(fn) != output['size']:
+				return False
+			if fingerprint(fn) != output['fingerprint']:
+				return False
+		return True
+	def record(self, line, outputs):
+		'''
+		Notes that line succeeded, writing outputs. Outputs may be patterns.
+		'''
+		entry = { 'key': command_key(line, outputs), 'time': time.time(), 'outputs': [] }
+		for fn in expand_outputs(outputs):
+			if os.path.isfile(fn):
+				entry['outputs'].append({ 'path': os.path.abspath(fn), 'size': os.path.getsize(fn), 'fingerprint': fingerprint(fn) })
+		with self.lock:
+			self.completed[entry['key']] = entry
+			with open(self.filename, 'a') as ofo:
+				ofo.write(json.dumps(entry)+'\n')
+				ofo.flush()
+				os.fsync(ofo.fileno())
@@ -0,0 +1,135 @@
+"""
+Keyframe index from ffprobe packet flags, for moving cuts onto keyframes
+before stream-copying.
+
+Indices are kept in the probe cache as packed doubles, 8 bytes per keyframe.
+"""
+from array import array
+import bisect
+import subprocess
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from . import SplitterException, stream_encoding
+from .choices import snap_choices
+from .cuttable import CutTable
+from .FFprobe import executable as ffprobe_executable, require_frame_rate
+from .probe_cache import get_cache
+
+
+class KeyframeException(SplitterException):
+	pass
+
+
+def parse_packets(lines, encoding=stream_encoding):
+	'''
+	Yields the time of each keyframe packet from lines of ffprobe's csv=p=0 output
+	'''
+	for b in lines:
+		line = b.decode(encoding).strip()
+		if not line:
+			continue
+		t, flags = line.split(',', 1)
+		if 'K' in flags and t != 'N/A':
+			yield float(t)
+def ffprobe_keyframes(filename, stream='v:0'):
+	command = [ ffprobe_executable, '-v', 'error',
+				'-select_streams', stream,
+				'-show_entries', 'packet=pts_time,flags',
+				'-of', 'csv=p=0',
+				filename ]
+	debug( " ".join(command) )
+	proc = subprocess.Popen(command,
+		stdin=subprocess.DEVNULL,
+		stdout=subprocess.PIPE) # stderr goes to console
+	keyframes = array('d', parse_packets(proc.stdout))
+	if proc.wait():
+		raise KeyframeException("{} failed on {}".format(ffprobe_executable, filename))
+	return array('d', sorted(keyframes)) # packets are in decode order
+def get_keyframes(filename, use_cache=True):
+	'''
+	Returns a sorted array of keyframe times in seconds
+	'''
+	cache = get_cache() if use_cache else None
+	if cache:
+		b = cache.get(filename, kind='keyframes')
+		if b is not None:
+			keyframes = array('d')
+			keyframes.frombytes(b)
+			return keyframes
+	keyframes = ffprobe_keyframes(filename)
+	debug( "{} keyframes in {}".format(len(keyframes), filename) )
+	if cache:
+		cache.put(filename, keyframes.tobytes(), kind='keyframes')
+	return keyframes
+
+
+def snap(t, keyframes, how='nearest'):
+	'''
+	Returns the keyframe nearest to, at or before, or at or after t
+	'''
+	if not keyframes:
+		return t
+	i = bisect.bisect_left(keyframes, t)
+	if i < len(keyframes) and keyframes[i] == t:
+		return t
+	# with no keyframe on one side, t is left where it is
+	before = keyframes[i-1] if 0 < i else None
+	after = keyframes[i] if i < len(keyframes) else None
+	if 'previous' == how:
+		return t if before is None else before
+	elif 'next' == how:
+		return t if after is None else after
+	if before is None or after is None:
+		return before if after is None else after
+	return before if (t-before) <= (after-t) else after
+def snap_splits(splits, keyframes, how='nearest'):
+	'''
+	Moves each (start, end) in decimal seconds onto keyframes. Open ends stay open.
+	'''
+	def s(t):
+		return repr(snap(float(t), keyframes, how)) if t else t
+	return [ (s(b), s(e)) for (b, e) in splits ]
+def snap_frames(frames, keyframes, fps, how='nearest'):
+	'''
+	Moves each (start, end) frame number onto keyframes. Open ends stay open.
+	'''
+	def s(f):
+		return round(snap(int(f)/fps, keyframes, how)*fps) if f else f
+	return [ (s(b), s(e)) for (b, e) in frames ]
+def snap_cuts(filename, options, how='nearest'):
+	'''
+	Replaces the 'splits' or 'frames' in options with ones moved onto keyframes
+	of filename, and reports which moved.
+	'''
+	if how not in snap_choices:
+		raise KeyframeException("Snap must be one of {}, not {}".format(', '.join(snap_choices), how))
+	keyframes = get_keyframes(filename)
+	if not keyframes:
+		warning("No keyframes found in {}, cuts unchanged".format(filename))
+		return options
+	if 'splits' in options:
+		key, before = 'splits', options['splits']
+		after = snap_splits(before, keyframes, how)
+	elif 'frames' in options:
+		key, before = 'frames', options['frames']
+		after = snap_frames(before, keyframes, require_frame_rate(filename, KeyframeException), how)
+	else:
+		return options
+	for n, (old, new) in enumerate(zip(before, after), start=1):
+		if any(float(o or 0) != float(a or 0) for o, a in zip(old, new)):
+			info( "Cut {} moved from {}-{} to {}-{}".format(n, *(tuple(old)+tuple(new))) )
+	if isinstance(before, CutTable):
+		after = CutTable.from_pairs(after, units=before.units)
+	options[key] = after
+	return options
@@ -1,5 +1,6 @@
 
 import os.path
+import sys
 
 
 try:
@@ -54,48 +55,61 @@ class Cut(Namespace):
 			else: return self['entry_name']
 
 def _parse(filename):
-	with open(filename) as fi:
-		numbered_lines = [(NR, line.rstrip()) for NR, line in enumerate(fi)]
-	header = ''
-	while not header.startswith('#EXTM3U'):
-		NR, header = numbered_lines.pop(0)
+	'''
+	Yields each Cut as soon as its filename line is read, in one pass
+	'''
 	number_cuts = 0
-	### TODO: hackish
-	cut = Cut(order=number_cuts)
-	cut['file_duration'] = cut['entry_name'] = None
-	for NR, line in numbered_lines:
-		if line:
+	with open(filename) as fi:
+		numbered_lines = enumerate(fi, start=1)
+		for NR, line in numbered_lines:
+			if line.startswith('#EXTM3U'):
+				break
+		else:
+			warning("{}: no #EXTM3U header".format(filename))
+			return
+		### TODO: hackish
+		cut = Cut(order=number_cuts)
+		cut['file_duration'] = cut['entry_name'] = None
+		for NR, line in numbered_lines:
+			line = line.rstrip()
+			if not line:
+				continue
 			if line.startswith('#EXTINF'):
 				_, text = line.split(':', 1)
-				#assert 'file_duration' not in cut
 				if ',' in text:
-					#cut['file_duration'], cut['entry_name'] = file_duration = text.split(',')
 					cut['file_duration'], cut['entry_name'] = text.split(',', 1)
 				else:
 					cut['file_duration'] = text
 			elif line.startswith('#EXTVLCOPT'):
 				_, text = line.split(':', 1)
-				if '=' in text:
-					attrib, value = text.split('=', 1)
-				assert attrib not in cut
+				if '=' not in text:
+					warning("{}:{}: malformed option '{}' ignored".format(filename, NR, text))
+					continue
+				attrib, value = text.split('=', 1)
+				if attrib in cut:
+					warning("{}:{}: repeated {} ignored".format(filename, NR, attrib))
+					continue
 				if attrib == 'stop-time':
 					# VLC bugs
 					try:
 						assert 0 < float(value)
 					except:
-						error("Illegal {attrib}={value} ignored".format(**locals()))
+						error("{}:{}: illegal {}={} ignored".format(filename, NR, attrib, value))
 						continue
 				cut[attrib] = value
 			elif line.startswith('#'):
-				warning("Line {NR} ignored".format(**locals()))
+				warning("{}:{}: line ignored".format(filename, NR))
 				info("Unrecognized comment or metadata: "+line)
 			else:
 				cut['filename'] = line
-			### Checks on crazy file durations
-				if cut['file_duration'] and (60*60*12 < float(cut['file_duration'])):
+				### Checks on crazy file durations
+				try:
+					if cut['file_duration'] and (60*60*12 < float(cut['file_duration'])):
+						cut['file_duration'] = None
+				except ValueError:
+					warning("{}:{}: illegal duration {} ignored".format(filename, NR, cut['file_duration']))
 					cut['file_duration'] = None
-			###
-			if 'filename' in cut:
+				###
 				if not 'start-time' in cut and 'stop-time' in cut:
 					cut['start-time'] = '0'
 				elif 'start-time' in cut and not 'stop-time' in cut:
@@ -105,6 +119,7 @@ def _parse(filename):
 				### TODO: hackish
 				cut = Cut(order=number_cuts)
 				cut['file_duration'] = cut['entry_name'] = None
+iter_extended_m3u_file = _parse
 
 
 def extended_m3u_file(*args, **kwargs):
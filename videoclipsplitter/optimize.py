@@ -0,0 +1,96 @@
+"""
+Tidy a cut list before commands are generated.
+
+Drops empty and inverted cuts, clamps cuts to the end of the file, and merges
+cuts that overlap or touch, so per-cut converters like MP4Box launch fewer
+processes. Cuts that are merely close stay separate, since merging them would
+include what's between them; see FFmpeg.batch_cuts for running them in one
+process instead.
+"""
+from decimal import Decimal
+from fractions import Fraction
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .cuttable import CutTable, OPEN, one_second, ticks_per_second
+from .FFprobe import get_duration, get_frame_rate
+
+
+def optimize(table, file_end=OPEN):
+	'''
+	Returns a new CutTable and a list of messages describing what changed.
+	file_end is in the table's ticks.
+	'''
+	report = []
+	y = report.append
+	def show(t):
+		return t if 'frames' == table.units else Decimal(t)/one_second
+	def describe(i, b, e):
+		return "cut {} ({}-{})".format(i+1, show(b), 'end' if e == OPEN else show(e))
+	kept = []
+	for i, (b, e) in enumerate(zip(table.starts, table.ends)):
+		if file_end != OPEN:
+			if file_end <= b:
+				y( describe(i, b, e)+" dropped, starts after the end of the file" )
+				continue
+			if e == OPEN or file_end < e:
+				if e != OPEN:
+					y( describe(i, b, e)+" clamped to the end of the file" )
+				e = file_end
+		if e != OPEN and e <= b:
+			y( describe(i, b, e)+(" dropped, zero length" if e == b else " dropped, ends before it starts") )
+			continue
+		kept.append( (b, e, i) )
+	kept.sort(key=lambda c: (c[0], (1<<62) if c[1] == OPEN else c[1]))
+	starts, ends = [], []
+	last_i = None
+	for b, e, i in kept:
+		if ends and (ends[-1] == OPEN or b <= ends[-1]):
+			y( "cut {} merged into overlapping or adjacent cut {}".format(i+1, last_i+1) )
+			if ends[-1] != OPEN and (e == OPEN or ends[-1] < e):
+				ends[-1] = e
+			continue
+		starts.append(b)
+		ends.append(e)
+		last_i = i
+	return CutTable(starts, ends, units=table.units), report
+def optimize_cuts(filename, options):
+	'''
+	Replaces the 'splits' or 'frames' in options with optimized ones, logging
+	what changed.
+	'''
+	key = 'splits' if 'splits' in options else 'frames'
+	if key not in options:
+		return options
+	table = options[key]
+	if not isinstance(table, CutTable):
+		table = CutTable.from_pairs(table, units='seconds' if 'splits' == key else 'frames')
+	file_end = OPEN
+	try:
+		duration = Fraction(get_duration(filename).total_seconds())
+		fps = get_frame_rate(filename) if 'frames' == table.units else None
+	except Exception as e:
+		warning( "Cuts not clamped, {} could not be probed: {}".format(filename, e) )
+		duration = fps = None
+	if 'frames' == table.units:
+		if fps:
+			file_end = round(duration*fps)
+	elif duration:
+		file_end = round(duration*ticks_per_second)
+	optimized, report = optimize(table, file_end=file_end)
+	for line in report:
+		info( "{}: {}".format(filename, line) )
+	if report:
+		warning( "{}: {} cuts optimized to {}".format(filename, len(table), len(optimized)) )
+	options[key] = optimized
+	return options
@@ -0,0 +1,136 @@
+"""
+Orders the eligible converters for a job by estimated cost, cheapest first.
+
+A converter's cost is the bytes it has to read at its throughput, plus a
+fixed overhead for each process it starts. Which parts of the input it reads,
+and in how many processes, comes from the converter's get_reads(). Throughput
+is the median measured in earlier jobs on the same container, from telemetry
+JSON lines files, then on any container, then a rough default. It's measured
+as bytes read per second, on the same model, so a converter that reads only
+the cuts isn't credited for that twice. The defaults keep the traditional
+order when there's no history.
+"""
+import collections
+import json
+import os.path
+import statistics
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .cuttable import CutTable
+
+
+# MB/s read, when a converter has no history
+default_mb_per_s = {
+	'mkvmerge':	400.,
+	'MP4Box':	350.,
+	'ffmpeg':	300.,
+	'avidemux':	100.,
+	'asfbin':	80. }
+process_overhead_s = 0.05 # starting a converter and seeking
+
+
+Estimate = collections.namedtuple('Estimate', 'name converter seconds bytes_read processes mb_per_s samples')
+
+
+class History:
+	'''
+	Throughput of successful jobs, by converter and container
+	'''
+	def __init__(self, *filenames):
+		self.samples = collections.defaultdict(list)
+		for fn in filenames:
+			if fn and os.path.isfile(fn):
+				self.load(fn)
+	def load(self, filename):
+		with open(filename) as fi:
+			for NR, line in enumerate(fi, start=1):
+				try:
+					record = json.loads(line)
+				except ValueError:
+					debug( "{}:{}: unreadable, ignored".format(filename, NR) )
+					continue
+				if 'job' != record.get('event') or not record.get('success') or not record.get('read_mb_per_s'):
+					continue
+				converter, container = record['converter'], record.get('container')
+				self.samples[(converter, container)].append(record['read_mb_per_s'])
+				self.samples[(converter, None)].append(record['read_mb_per_s'])
+	def throughput(self, converter, container):
+		'''
+		Returns (MB/s, number of jobs it's based on)
+		'''
+		for key in ( (converter, container), (converter, None) ):
+			samples = self.samples.get(key)
+			if samples:
+				return statistics.median(samples), len(samples)
+		return default_mb_per_s.get(converter, min(default_mb_per_s.values())), 0
+
+
+def get_cuts(input_filename, options, fps=None):
+	'''
+	Returns the cuts in options as a CutTable of seconds, or None
+	'''
+	if 'splits' in options:
+		cuts = options['splits']
+		return cuts if isinstance(cuts, CutTable) else CutTable.from_pairs(cuts)
+	if 'frames' in options and fps:
+		cuts = options['frames']
+		if not isinstance(cuts, CutTable):
+			cuts = CutTable.from_pairs(cuts, units='frames')
+		return cuts.to_seconds(fps)
+def get_bytes_read(converter, input_filename, options):
+	'''
+	Returns (bytes, processes): what converter reads of input_filename with
+	options, at the file's average bitrate, and how many processes it starts
+	'''
+	from .FFprobe import ffprobe, get_frame_rate
+	size = os.path.getsize(input_filename)
+	try:
+		p = ffprobe(input_filename)
+		duration = float(p['format']['duration'])
+		bitrate = p['format'].get('bit_rate')
+		fps = get_frame_rate(p)
+	except Exception as e:
+		debug( "Estimating {} without probing: {}".format(input_filename, e) )
+		return size, 1
+	cuts = get_cuts(input_filename, options, fps=fps)
+	if not (cuts and duration):
+		return size, 1
+	cuts = [ (float(b), None if e is None else float(e)) for (b, e) in cuts ]
+	reads = converter.get_reads(input_filename, cuts, duration, **options)
+	covered = sum(max(0., min(e, duration)-b) for (b, e) in reads)
+	bytes_per_second = bitrate/8 if bitrate else size/duration
+	return min(size, int(covered*bytes_per_second)), max(1, len(reads))
+def estimate(name, converter, input_filename, options, history):
+	'''
+	Returns an Estimate for converter running on input_filename
+	'''
+	container = os.path.splitext(input_filename)[-1].upper()
+	bytes_read, processes = get_bytes_read(converter, input_filename, options)
+	mb_per_s, samples = history.throughput(name, container)
+	seconds = bytes_read/(mb_per_s*1e6)+processes*process_overhead_s
+	return Estimate(name, converter, seconds, bytes_read, processes, mb_per_s, samples)
+def plan(converters, input_filename, options, history=None):
+	'''
+	Returns an Estimate for each (name, converter), cheapest first. Ties keep
+	the order given.
+	'''
+	history = history or History()
+	estimates = [ estimate(name, converter, input_filename, options, history) for name, converter in converters ]
+	return sorted(estimates, key=lambda e: e.seconds)
+def print_plan(estimates, input_filename, file=sys.stderr):
+	print("# Plan for {}:".format(input_filename), file=file)
+	for n, e in enumerate(estimates, start=1):
+		print("#  {}. {:<9} ~{:.2f}s: {:,} B in {} process{} at {:.0f} MB/s ({})".format(
+			n, e.name, e.seconds, e.bytes_read, e.processes, '' if 1 == e.processes else 'es', e.mb_per_s,
+			"{} past jobs".format(e.samples) if e.samples else "default"), file=file)
@@ -0,0 +1,111 @@
+"""
+On-disk cache of probe results, shared between processes.
+
+Entries are keyed by what was probed (kind) and by the file's fingerprint, so
+a changed file simply misses, while a copied or renamed one still hits.
+Entries not used for max_age seconds expire, and the least recently used
+entries are evicted beyond max_entries. Both happen when the cache is opened,
+and again every evict_every writes by a long-running process.
+"""
+from contextlib import closing
+import os, os.path
+import sqlite3
+import sys
+import time
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .fingerprint import fingerprint
+
+cache_dir = os.environ.get('VIDEOCLIPSPLITTER_CACHE') \
+	or os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'videoclipsplitter')
+
+schema = '''CREATE TABLE IF NOT EXISTS probe_results (
+	kind TEXT NOT NULL,
+	fingerprint TEXT NOT NULL,
+	value BLOB,
+	last_access REAL NOT NULL,
+	PRIMARY KEY (kind, fingerprint) )'''
+
+
+class ProbeCache:
+	max_age = 60*60*24*90
+	max_entries = 100000
+	evict_every = 100 # writes
+	def __init__(self, filename=None, max_age=None, max_entries=None):
+		self.filename = filename or os.path.join(cache_dir, 'probes.sqlite')
+		if max_age:
+			self.max_age = max_age
+		if max_entries:
+			self.max_entries = max_entries
+		self.enabled = True
+		self.writes = 0
+		try:
+			dirname, _ = os.path.split(self.filename)
+			os.makedirs(dirname, exist_ok=True)
+			with closing(self.connect()) as db, db:
+				db.execute('PRAGMA journal_mode=WAL')
+				db.execute(schema)
+				self.evict(db)
+		except (OSError, sqlite3.Error) as e:
+			warning( "Probe cache {} disabled: {}".format(self.filename, e) )
+			self.enabled = False
+	def connect(self):
+		# one connection per call keeps this safe across threads as well as processes
+		return sqlite3.connect(self.filename, timeout=60)
+	def get(self, filename, kind='ffprobe'):
+		if not self.enabled:
+			return None
+		key = fingerprint(filename)
+		try:
+			with closing(self.connect()) as db, db:
+				row = db.execute('SELECT value FROM probe_results WHERE kind=? AND fingerprint=? AND ?<last_access',
+								 (kind, key, time.time()-self.max_age)).fetchone()
+				if row:
+					db.execute('UPDATE probe_results SET last_access=? WHERE kind=? AND fingerprint=?', (time.time(), kind, key))
+		except sqlite3.Error as e:
+			warning( "Probe cache lookup failed: {}".format(e) )
+			return None
+		if row:
+			debug( "{} cache hit for {}".format(kind, filename) )
+			return row[0]
+	def put(self, filename, value, kind='ffprobe'):
+		if not self.enabled:
+			return
+		key = fingerprint(filename)
+		try:
+			with closing(self.connect()) as db, db:
+				db.execute('INSERT OR REPLACE INTO probe_results VALUES (?, ?, ?, ?)',
+						   (kind, key, value, time.time()))
+				self.writes += 1
+				if not self.writes % self.evict_every:
+					self.evict(db)
+		except sqlite3.Error as e:
+			warning( "Probe cache update failed: {}".format(e) )
+	def evict(self, db):
+		expired = db.execute('DELETE FROM probe_results WHERE last_access<?', (time.time()-self.max_age,)).rowcount
+		if 0 < expired:
+			debug( "{} expired probe results removed".format(expired) )
+		count, = db.execute('SELECT COUNT(*) FROM probe_results').fetchone()
+		if count <= self.max_entries:
+			return
+		debug( "Evicting {} probe results".format(count-self.max_entries) )
+		db.execute('DELETE FROM probe_results WHERE rowid NOT IN (SELECT rowid FROM probe_results ORDER BY last_access DESC LIMIT ?)',
+				   (self.max_entries,))
+
+
+_cache = None
+def get_cache():
+	global _cache
+	if _cache is None:
+		_cache = ProbeCache()
+	return _cache
@@ -0,0 +1,90 @@
+"""
+Checks many files against many backends at once.
+
+Each (backend, file) check is its own short subprocess, so they run in a
+bounded thread pool. Once a backend fails any file, its remaining checks are
+cancelled. Verdicts are kept in the probe cache by file fingerprint and the
+backend's version, so unchanged files aren't probed again:
+
+	verdicts = ProbeEngine(jobs=8).run(match_backends(*filenames), filenames)
+"""
+import concurrent.futures
+import os
+import sys
+import threading
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .discovery import discover, default_names
+
+
+class ProbeEngine:
+	def __init__(self, jobs=None, use_cache=True):
+		self.jobs = jobs or min(32, 4*(os.cpu_count() or 1)) # the work is in subprocesses
+		self.use_cache = use_cache
+	def get_kind(self, backend):
+		'''
+		The probe cache kind for backend's verdicts, which changes with its version
+		'''
+		t = discover(backend.name) if backend.name in default_names else None
+		return 'verdict:{}:{}'.format(backend.name, t.version if t else '')
+	def check(self, backend, filename, kind=None):
+		'''
+		Returns True if backend accepts filename. Errors count as a rejection,
+		but aren't cached.
+		'''
+		from .probe_cache import get_cache
+		cache = get_cache() if (self.use_cache and kind) else None
+		if cache:
+			b = cache.get(filename, kind=kind)
+			if b is not None:
+				return b == b'1'
+		try:
+			verdict = bool(backend.probe(filename))
+		except Exception as e:
+			debug( "{} probe of {} failed: {}".format(backend.name, filename, e) )
+			return False
+		if cache:
+			cache.put(filename, b'1' if verdict else b'0', kind=kind)
+		return verdict
+	def run(self, backends, filenames):
+		'''
+		Returns { backend name: True if it accepts every one of filenames }
+		'''
+		backends, filenames = list(backends), list(filenames)
+		verdicts = { b.name: True for b in backends }
+		kinds = { b.name: self.get_kind(b) for b in backends }
+		lock, failed = threading.Lock(), set()
+		def check(backend, filename):
+			with lock:
+				if backend.name in failed: # started before it was cancelled
+					return False
+			return self.check(backend, filename, kind=kinds[backend.name])
+		debug( "Probing {} files with {} backends, {} at once".format(len(filenames), len(backends), self.jobs) )
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+			futures = {}
+			for fn in filenames: # interleaved, so that every backend gets an early verdict
+				for b in backends:
+					futures[executor.submit(check, b, fn)] = b
+			for future in concurrent.futures.as_completed(futures):
+				if future.cancelled():
+					continue
+				b = futures[future]
+				if not future.result() and verdicts[b.name]:
+					debug( "{} failed, cancelling its other probes".format(b.name) )
+					verdicts[b.name] = False
+					with lock:
+						failed.add(b.name)
+					for other, ob in futures.items():
+						if ob is b:
+							other.cancel()
+		return verdicts
@@ -0,0 +1,179 @@
+"""
+Progress of running commands as typed events, whatever tool is reporting.
+
+Each converter turns its tool's progress output into ProgressEvents with
+parse_progress(). A Progress follows every command of one run, fills in the
+overall percentage and ETA, and passes each event to a callback and to a
+single progress bar:
+
+	def show(event):
+		print(event.overall_percent, event.overall_eta_s)
+	for result in converter.run(filename, progress_callback=show, **options):
+		...
+"""
+import collections
+import re
+import sys
+import threading
+import time
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+fields = [ 'command',		# index into the commands of the run
+		   'percent',		# of this command, or None if unknown
+		   'media_s',		# seconds of media processed
+		   'speed',			# times realtime
+		   'bytes_written',
+		   'eta_s',			# of this command
+		   'overall_percent',
+		   'overall_eta_s' ]
+class ProgressEvent(collections.namedtuple('ProgressEvent', fields)):
+	__slots__ = ()
+ProgressEvent.__new__.__defaults__ = (None,)*len(fields)
+PENDING = object() # a progress line that doesn't complete an event
+
+
+def parse_timestamp(text):
+	'''
+	HH:MM:SS.ss to seconds
+	'''
+	h, m, s = text.split(':')
+	return int(h)*3600+int(m)*60+float(s)
+def parse_speed(text):
+	text = text.strip().rstrip('x')
+	try:
+		return float(text)
+	except ValueError: # N/A
+		return None
+def parse_size(text):
+	m = re.match(r'(\d+)\s*([kKmMgG]?)i?B', text.strip())
+	if not m:
+		return None
+	return int(m.group(1)) << { '': 0, 'K': 10, 'M': 20, 'G': 30 }[m.group(2).upper()]
+ffmpeg_stats = re.compile(r'(\w+)=\s*(\S+)')
+def parse_ffmpeg_stats(line):
+	'''
+	Reads ffmpeg's frame= ... time= ... speed= status lines
+	'''
+	if not line.startswith('frame='):
+		return None
+	d = dict(ffmpeg_stats.findall(line.rsplit('\r', 1)[-1]))
+	media_s = parse_timestamp(d['time']) if ':' in d.get('time', '') else None
+	return ProgressEvent(media_s=media_s,
+						 speed=parse_speed(d.get('speed', '')),
+						 bytes_written=parse_size(d.get('size', d.get('Lsize', ''))))
+def parse_ffmpeg_progress(line, state):
+	'''
+	Reads the key=value lines of ffmpeg -progress, returning an event at the end
+	of each block and PENDING before. state is a dict kept for the life of the
+	command.
+	'''
+	key, sep, value = line.partition('=')
+	if not sep:
+		return None
+	state[key.strip()] = value.strip()
+	if 'progress' != key.strip():
+		return PENDING
+	media_s = None
+	for k in ('out_time_us', 'out_time_ms'): # both are microseconds
+		if state.get(k, 'N/A').lstrip('-').isdigit():
+			media_s = max(0, int(state[k]))/1e6
+			break
+	size = state.get('total_size', '')
+	return ProgressEvent(media_s=media_s,
+						 speed=parse_speed(state.get('speed', '')),
+						 bytes_written=int(size) if size.isdigit() else None,
+						 percent=100. if 'end' == value.strip() else None)
+percent_patterns = [ re.compile(r'Progress:\s*(\d+)%\s*$'),		# mkvmerge
+					 re.compile(r'\((\d+)/100\)\s*$'),				# MP4Box
+					 re.compile(r'^0-100%:.*?(\d+)\s*$') ]			# AsfBin
+def parse_percent(line):
+	'''
+	Reads the percentage from mkvmerge, MP4Box or AsfBin progress lines
+	'''
+	line = line.rsplit('\r', 1)[-1]
+	for p in percent_patterns:
+		m = p.search(line)
+		if m:
+			return ProgressEvent(percent=float(m.group(1)))
+
+
+class Progress:
+	'''
+	Combines progress events from the commands of one run. Each command counts
+	in proportion to its expected media seconds where known, otherwise equally.
+	'''
+	def __init__(self, commands, expected_seconds=None, callback=None, bar=False):
+		self.commands = list(commands)
+		self.index = { id(line): n for n, line in enumerate(self.commands) }
+		self.expected = [ (expected_seconds(line) if expected_seconds else None) for line in self.commands ]
+		known = [ e for e in self.expected if e ]
+		default = sum(known)/len(known) if known else 1.
+		self.weights = [ e or default for e in self.expected ]
+		self.done = [ 0. ]*len(self.commands) # fractions
+		self.callback = callback
+		self.started = time.perf_counter()
+		self.lock = threading.Lock()
+		self.bar = None
+		if bar:
+			import tqdm
+			self.bar = tqdm.tqdm(total=100, unit='%', desc="{} commands".format(len(self.commands)),
+								 bar_format='{l_bar}{bar}| {n:.1f}% [{elapsed}{postfix}]')
+	def update(self, line, event):
+		'''
+		Takes an event from the command line, filling in what can be worked out
+		'''
+		n = self.index[id(line)]
+		expected = self.expected[n]
+		percent = event.percent
+		if percent is None and expected and event.media_s is not None:
+			percent = min(100., 100.*event.media_s/expected)
+		eta_s = event.eta_s
+		if eta_s is None and expected and event.media_s is not None and event.speed:
+			eta_s = max(0., (expected-event.media_s)/event.speed)
+		with self.lock:
+			if percent is not None:
+				self.done[n] = percent/100.
+			overall, overall_eta_s = self.overall()
+		event = event._replace(command=n, percent=percent, eta_s=eta_s,
+							   overall_percent=100.*overall, overall_eta_s=overall_eta_s)
+		self.report(event)
+		return event
+	def finish(self, line, success=True):
+		n = self.index[id(line)]
+		with self.lock:
+			self.done[n] = 1.
+			overall, overall_eta_s = self.overall()
+		self.report(ProgressEvent(command=n, percent=100. if success else None,
+								  overall_percent=100.*overall, overall_eta_s=overall_eta_s))
+	def overall(self):
+		fraction = sum(w*d for w, d in zip(self.weights, self.done))/sum(self.weights)
+		elapsed = time.perf_counter()-self.started
+		eta_s = elapsed*(1-fraction)/fraction if fraction else None
+		return fraction, eta_s
+	def report(self, event):
+		if self.bar is not None:
+			with self.lock:
+				self.bar.n = event.overall_percent
+				postfix = []
+				if event.speed:
+					postfix.append('{:.1f}x'.format(event.speed))
+				if event.overall_eta_s is not None:
+					postfix.append('ETA {:.0f}s'.format(event.overall_eta_s))
+				self.bar.set_postfix_str(', '.join(postfix), refresh=False)
+				self.bar.refresh()
+		if self.callback:
+			self.callback(event)
+	def close(self):
+		if self.bar is not None:
+			self.bar.close()
@@ -0,0 +1,97 @@
+"""
+What each converter takes and can do, known without importing it.
+
+Each backend is declared here with its file extensions, capabilities, and
+where its converter class and probe function live. Choosing converters for a
+file only consults this table. A backend's module, and any template it reads,
+is imported the first time its converter or probe is used:
+
+	for backend in match_backends('movie.mkv'):
+		converter = backend.converter(dry_run=True)
+"""
+import importlib
+import os.path
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+class Backend:
+	'''
+	A converter's metadata, and a lazy loader for its module. extensions=None
+	takes any extension not in excluded_extensions.
+	'''
+	def __init__(self, name, module, class_name,
+				 extensions=None, excluded_extensions=(),
+				 can_split=False, can_chapter=False, frame_accurate=False,
+				 can_probe=True):
+		self.name, self.module, self.class_name = name, module, class_name
+		self.extensions = frozenset(extensions) if extensions is not None else None
+		self.excluded_extensions = frozenset(excluded_extensions)
+		self.can_split, self.can_chapter, self.frame_accurate = can_split, can_chapter, frame_accurate
+		self.can_probe = can_probe
+	def load(self):
+		'''
+		Imports the backend's module, once
+		'''
+		return importlib.import_module('.'+self.module, __package__)
+	@property
+	def converter_class(self):
+		return getattr(self.load(), self.class_name)
+	def converter(self, **kwargs):
+		return self.converter_class(**kwargs)
+	def probe(self, *args):
+		return self.load().probe(*args)
+	def matches(self, filename):
+		_, ext = os.path.splitext(filename)
+		ext = ext.upper()
+		if ext in self.excluded_extensions:
+			return False
+		return (self.extensions is None) or (ext in self.extensions)
+	def match_filenames(self, *args):
+		return [ fn for fn in args if self.matches(fn) ]
+	def __repr__(self):
+		return "<Backend {} in {}.{}>".format(self.name, self.module, self.class_name)
+
+
+# in the order they're tried when there's nothing to choose between them
+backends = [
+	Backend('mkvmerge',	'MkvMerge',	'MkvMergeConverter',
+			excluded_extensions=( '.ASF', '.WMV', '.MOV', '.MPG', '.MP4', '.M4V' ),
+			can_split=True, can_chapter=True),
+	Backend('MP4Box',	'gpac',		'GpacConverter',
+			extensions=( '.3GP', '.3G2', '.F4V', '.M4V', '.MJ2', '.MOV', '.MP4', '.MPG' ),
+			can_split=True, can_chapter=True),
+	Backend('ffmpeg',	'FFmpeg',	'FFmpegConverter',
+			excluded_extensions=( '.ASF', '.WMV' ),
+			can_split=True, frame_accurate=True), # frame-accurate with strategy='smart'
+	Backend('avidemux',	'AviDemux',	'AviDemuxConverter',
+			extensions=( '.AVI', '.DIVX', '.FLV', '.MKV', '.OGM', '.WEBM', '.XVID' ),
+			can_probe=False), # its probe is a guess from file(1)
+	Backend('asfbin',	'AsfBin',	'AsfBinConverter',
+			extensions=( '.ASF', '.WMV' ),
+			can_split=True) ]
+by_name = { b.name.upper(): b for b in backends }
+
+
+def get_backend(name):
+	'''
+	Returns the Backend called name, in any case, or None
+	'''
+	return by_name.get(name.strip().upper())
+def match_backends(*filenames):
+	'''
+	Yields the backends that take any of filenames, in order
+	'''
+	for b in backends:
+		if any(b.matches(fn) for fn in filenames):
+			yield b
@@ -0,0 +1,128 @@
+"""
+Private scratch space for the side files converters generate: MkvMerge
+option files, AviDemux scripts, AsfBin segment lists, chapter files, and the
+parts of smart cuts.
+
+Each job gets its own directory, so concurrent jobs on the same input can't
+overwrite each other, and nothing is left in the working directory. Small
+files go on /dev/shm where it's available (or $VIDEOCLIPSPLITTER_SCRATCH).
+Large intermediates go in a hidden directory beside the outputs instead, on
+the same filesystem and not in memory. Both are removed when the job ends,
+unless keep=True.
+
+A dry run only prints a script, which needs its side files later, so they
+are kept. Its large intermediates' directories are named but not made: the
+script makes them, and removes them and the side files when it's done (see
+script_prologue() and script_epilogue()).
+
+Scratch paths differ between runs, so normalize() replaces them before
+commands are compared by the journal and the segment cache.
+"""
+import os, os.path
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+prefix = 'videoclipsplitter-scratch-'
+placeholder = '\0SCRATCH'
+scratch_pattern = re.compile(r'[^\s\'"@=]*?\.?'+re.escape(prefix)+r'[^\\/\s\'"]*')
+
+
+def get_scratch_root():
+	root = os.environ.get('VIDEOCLIPSPLITTER_SCRATCH')
+	if root:
+		return root
+	if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+		return '/dev/shm'
+	return tempfile.gettempdir()
+def normalize(text):
+	'''
+	Replaces scratch directories in text, str or bytes, with a placeholder
+	'''
+	if isinstance(text, bytes):
+		return re.sub(scratch_pattern.pattern.encode('UTF-8'), placeholder.encode('UTF-8'), text)
+	return scratch_pattern.sub(placeholder, text)
+def is_intermediate(filename):
+	'''
+	True for files made by bulk_path(), which are written by the commands that
+	use them, so their contents don't identify a command
+	'''
+	return (os.sep+'.'+prefix) in os.path.abspath(filename)
+
+
+class Scratch:
+	'''
+	Directories are only made when a path is first asked for
+	'''
+	def __init__(self, keep=False, root=None, dry_run=False):
+		self.keep = keep or dry_run
+		self.root = root or get_scratch_root()
+		self.dry_run = dry_run
+		self.lock = threading.Lock()
+		self.dirnames = {}
+		self.planned = [] # directories left for a dry run's script to make
+	def get_dirname(self, near=None):
+		key = os.path.abspath(near) if near is not None else None
+		with self.lock:
+			if key not in self.dirnames:
+				if key is None:
+					self.dirnames[key] = tempfile.mkdtemp(prefix=prefix, dir=self.root)
+				elif self.dry_run:
+					self.dirnames[key] = os.path.join(key, '.'+prefix+uuid.uuid4().hex[:8])
+					self.planned.append(self.dirnames[key])
+				else:
+					self.dirnames[key] = tempfile.mkdtemp(prefix='.'+prefix, dir=key)
+				debug( "Scratch directory "+self.dirnames[key] )
+			return self.dirnames[key]
+	def path(self, name):
+		'''
+		Returns a private path for a small side file
+		'''
+		return os.path.join(self.get_dirname(), os.path.basename(name))
+	def bulk_path(self, name, near='.'):
+		'''
+		Returns a private path for a large intermediate, on the same filesystem
+		as near
+		'''
+		return os.path.join(self.get_dirname(near), os.path.basename(name))
+	def script_prologue(self):
+		'''
+		Shell commands a dry run's script starts with
+		'''
+		if self.dry_run and self.planned:
+			yield [ 'mkdir', '-p' ]+self.planned
+	def script_epilogue(self):
+		'''
+		Shell commands a dry run's script ends with
+		'''
+		if self.dry_run and self.dirnames:
+			yield [ 'rm', '-rf' ]+sorted(self.dirnames.values())
+	def cleanup(self):
+		with self.lock:
+			dirnames, self.dirnames, self.planned = [ d for d in self.dirnames.values() if d not in self.planned ], {}, []
+		for dirname in dirnames:
+			if self.dry_run:
+				warning( "Scratch files kept in {} for the script, which removes them".format(dirname) )
+			elif self.keep:
+				warning( "Scratch files kept in "+dirname )
+			else:
+				shutil.rmtree(dirname, ignore_errors=True)
+	def __enter__(self):
+		return self
+	def __exit__(self, *args):
+		self.cleanup()
@@ -0,0 +1,209 @@
+"""
+Content-addressed cache of converter outputs, so that after a cut list is
+edited only the cuts that changed are converted again.
+
+A command's key is the identity of its input file and the command itself, with
+the input and output filenames left out, so a cut that is only renumbered still
+hits. Outputs are kept under the key in the cache directory and are brought
+back by reflink where the filesystem allows it, then hardlink, then copy. The
+least recently used entries are evicted beyond max_size bytes.
+"""
+import glob
+import hashlib
+import json
+import os, os.path
+import re
+import shutil
+import sys
+import threading
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .journal import command_key
+from .fingerprint import fingerprint
+from .probe_cache import cache_dir
+
+
+segment_dir = os.path.join(cache_dir, 'segments')
+FICLONE = 0x40049409 # from linux/fs.h
+
+
+def clone(src, dst):
+	'''
+	Makes dst a reflink of src, or failing that a hardlink, or failing that a
+	copy. dst is replaced atomically.
+	'''
+	dirname, basename = os.path.split(dst)
+	temp = os.path.join(dirname, '.{}.{}.tmp'.format(basename, threading.get_ident()))
+	try:
+		try:
+			import fcntl
+			with open(src, 'rb') as fi, open(temp, 'wb') as fo:
+				fcntl.ioctl(fo.fileno(), FICLONE, fi.fileno())
+		except (ImportError, OSError):
+			if os.path.exists(temp):
+				os.unlink(temp)
+			try:
+				os.link(src, temp)
+			except OSError:
+				shutil.copyfile(src, temp)
+		os.replace(temp, dst)
+	finally:
+		if os.path.exists(temp):
+			os.unlink(temp)
+def expand_outputs(outputs):
+	'''
+	Yields (index into outputs, number or None, filename) for each file
+	written, expanding printf-style patterns like name-%03d.mkv
+	'''
+	for i, fn in enumerate(outputs):
+		if '%' not in fn:
+			if os.path.isfile(fn):
+				yield i, None, fn
+			continue
+		pieces = re.split(r'(%0?\d*d)', fn)
+		pattern = ''.join(glob.escape(p) if n % 2 == 0 else '[0-9]'*int(p[1:-1] or 0) or '*' for n, p in enumerate(pieces))
+		regex = re.compile(''.join(re.escape(p) if n % 2 == 0 else r'(\d+)' for n, p in enumerate(pieces))+'$')
+		for match in sorted(glob.glob(pattern)):
+			m = regex.match(match)
+			if m:
+				yield i, int(m.group(1)), match
+
+
+class SegmentCache:
+	max_size = 20<<30 # bytes
+	def __init__(self, input_filename, dirname=segment_dir, max_size=None):
+		self.input_filename = input_filename
+		self.dirname = dirname
+		if max_size:
+			self.max_size = max_size
+		self.input_key = fingerprint(input_filename)
+		self.lock = threading.Lock()
+		self.total = None # bytes in the cache, counted at the first store
+	def get_key(self, line, outputs):
+		def strip(command):
+			return [ '\0INPUT' if arg == self.input_filename else
+					 '\0OUTPUT{}'.format(outputs.index(arg)) if arg in outputs else arg
+					 for arg in command ]
+		stripped = tuple(strip(c) for c in line) if isinstance(line, tuple) else strip(line)
+		return hashlib.sha1((self.input_key+command_key(stripped)).encode('UTF-8')).hexdigest()
+	def get_entry(self, key):
+		return os.path.join(self.dirname, key[:2], key)
+	def read_manifest(self, entry):
+		'''
+		Returns the list of (index into outputs, number, stored name, size) kept
+		in entry, or an empty list
+		'''
+		try:
+			with open(os.path.join(entry, 'manifest.json')) as fi:
+				return json.load(fi) or []
+		except FileNotFoundError:
+			return []
+	def contains(self, line, outputs):
+		if not outputs:
+			return False
+		try:
+			return bool(self.read_manifest(self.get_entry(self.get_key(line, outputs))))
+		except (OSError, ValueError):
+			return False
+	def restore(self, line, outputs):
+		'''
+		Puts cached outputs of line in place. Returns False on a miss.
+		'''
+		if not outputs:
+			return False
+		entry = self.get_entry(self.get_key(line, outputs))
+		try:
+			manifest = self.read_manifest(entry)
+			if not manifest: # nothing was kept, so nothing can be restored
+				return False
+			for i, n, stored, size in manifest:
+				if os.path.getsize(os.path.join(entry, stored)) != size: # written through a link
+					shutil.rmtree(entry, ignore_errors=True)
+					raise ValueError("{} changed size".format(stored))
+			for i, n, stored, size in manifest:
+				fn = outputs[i] if n is None else outputs[i] % n
+				clone(os.path.join(entry, stored), fn)
+			os.utime(os.path.join(entry, 'manifest.json')) # for eviction
+		except (OSError, ValueError, IndexError, TypeError) as e:
+			if not isinstance(e, FileNotFoundError):
+				warning( "Segment cache entry {} unusable: {}".format(entry, e) )
+			return False
+		debug( "Restored from segment cache: "+" ".join(outputs) )
+		return True
+	def unlink_outputs(self, outputs):
+		'''
+		Removes outputs that are linked into the cache, before they're written
+		again, so the cached copy isn't overwritten through the link
+		'''
+		for _, _, fn in expand_outputs(outputs):
+			if 1 < os.stat(fn).st_nlink:
+				os.unlink(fn)
+	def store(self, line, outputs):
+		'''
+		Keeps the outputs of line, which just succeeded
+		'''
+		if not outputs:
+			return
+		key = self.get_key(line, outputs)
+		entry = self.get_entry(key)
+		temp = entry+'.{}.tmp'.format(threading.get_ident())
+		try:
+			os.makedirs(temp, exist_ok=True)
+			manifest = []
+			for n, (i, number, fn) in enumerate(expand_outputs(outputs)):
+				stored = '{:04d}'.format(n)
+				clone(fn, os.path.join(temp, stored))
+				manifest.append( (i, number, stored, os.path.getsize(fn)) )
+			if not manifest:
+				debug( "Not cached, no outputs written: "+" ".join(outputs) )
+				return
+			with open(os.path.join(temp, 'manifest.json'), 'w') as ofo:
+				json.dump(manifest, ofo)
+			if os.path.isdir(entry):
+				shutil.rmtree(entry, ignore_errors=True)
+			os.rename(temp, entry)
+		except OSError as e:
+			warning( "Not cached: {}".format(e) )
+			return
+		finally:
+			if os.path.isdir(temp):
+				shutil.rmtree(temp, ignore_errors=True)
+		size = sum(size for _, _, _, size in manifest)
+		with self.lock:
+			if self.total is not None and self.total+size <= self.max_size:
+				self.total += size
+				return
+		self.evict()
+	def evict(self):
+		'''
+		Removes the least recently used entries until the cache fits max_size.
+		This walks the whole cache, so store() only calls it the first time and
+		when the running total grows past max_size.
+		'''
+		with self.lock:
+			entries = []
+			for manifest in glob.glob(os.path.join(self.dirname, '*', '*', 'manifest.json')):
+				entry, _ = os.path.split(manifest)
+				try:
+					size = sum(os.path.getsize(os.path.join(entry, fn)) for fn in os.listdir(entry))
+					entries.append( (os.path.getmtime(manifest), size, entry) )
+				except OSError:
+					continue
+			total = sum(size for _, size, _ in entries)
+			for _, size, entry in sorted(entries):
+				if total <= self.max_size:
+					break
+				debug( "Evicting "+entry )
+				shutil.rmtree(entry, ignore_errors=True)
+				total -= size
+			self.total = total
@@ -1,4 +1,17 @@
 #!/usr/bin/env python3
+import sys
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
 
 def parse(rows, NonePlaceholder=None):
 	last_end = NonePlaceholder
@@ -14,14 +27,26 @@ def parse(rows, NonePlaceholder=None):
 		yield mystart, myend
 		last_end = myend
 
+def iter_rows(filename, delim='\t'):
+	with open(filename) as fi:
+		for NR, line in enumerate(fi, start=1):
+			if not line.strip():
+				continue
+			row = line.rstrip('\r\n').split(delim)
+			if len(row) != 3:
+				warning("{}:{}: expected start, label and end, ignored".format(filename, NR))
+				continue
+			yield row
+def iter_splits_file(filename, delim='\t'):
+	'''
+	Yields (start, end) frame numbers in one pass
+	'''
+	return parse(iter_rows(filename, delim=delim))
+
 class old_splits_file:
 	def __init__(self, filename=None):
 		if filename:
 			self.open(filename)
 	def open(self, filename=None, delim='\t'):
 		self.filename = filename
-		with open(filename, 'Ur') as fi:
-			self.lines = [ line.rstrip('\n') for line in fi if line.strip() ]
-		self.rows = [ line.split(delim) for line in self.lines ]
-		#self.cuts = [ (b, e) for (b, label, e) in self.rows ]
-		self.cuts = list(parse(self.rows))
+		self.cuts = list(iter_splits_file(filename, delim=delim))
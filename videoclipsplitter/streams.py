@@ -0,0 +1,104 @@
+
+import queue
+import re
+import sys
+import threading
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+from .util import avoid_duplicates
+
+
+chunk_size = 1<<16
+max_line_length = 1<<16 # longer lines are truncated from the front
+max_queued_lines = 1<<10
+line_ends = re.compile(b'\r\n|\r|\n')
+
+
+class LineSplitter:
+	'''
+	Splits a stream of byte chunks into lines, without the line end.
+
+	Progress indicators rewrite one line with carriage returns, so a carriage
+	return ends a line as well, and each update is seen as it arrives. A line
+	that grows past max_line_length is cut back to its last max_line_length
+	bytes.
+	'''
+	def __init__(self, max_line_length=max_line_length):
+		self.max_line_length = max_line_length
+		self.buf = b''
+		self.after_cr = False
+	def feed(self, chunk):
+		if self.after_cr and chunk.startswith(b'\n'): # \r\n split between chunks
+			chunk = chunk[1:]
+		if chunk:
+			self.after_cr = chunk.endswith(b'\r')
+		*lines, self.buf = line_ends.split(self.buf+chunk)
+		if self.max_line_length < len(self.buf):
+			self.buf = self.buf[-self.max_line_length:]
+		return lines
+	def close(self):
+		buf, self.buf = self.buf, b''
+		return [ buf ] if buf else []
+def iter_lines(fileobj, chunk_size=chunk_size, max_line_length=max_line_length):
+	'''
+	Yields lines of bytes from fileobj as they arrive
+	'''
+	splitter = LineSplitter(max_line_length)
+	read = fileobj.read1 if hasattr(fileobj, 'read1') else fileobj.read
+	while True:
+		chunk = read(chunk_size)
+		if not chunk:
+			break
+		yield from splitter.feed(chunk)
+	yield from splitter.close()
+def _reader(fileobj, prefix, q):
+	try:
+		for b in avoid_duplicates(iter_lines(fileobj)):
+			q.put((prefix, b))
+	finally:
+		q.put((prefix, None))
+def follow(proc, parse_line, wait=None):
+	'''
+	Feeds each line of proc's stdout and stderr to parse_line(b, prefix=...) as
+	it arrives. parse_line is only called from the calling thread. If it raises,
+	proc is killed straight away and the exception is re-raised. Returns the
+	return code from wait(), by default proc.wait().
+	'''
+	q = queue.Queue(maxsize=max_queued_lines)
+	readers = []
+	for prefix, fileobj in [ ('STDOUT', proc.stdout), ('STDERR', proc.stderr) ]:
+		if fileobj is None:
+			continue
+		t = threading.Thread(target=_reader, args=(fileobj, prefix, q), daemon=True)
+		t.start()
+		readers.append(t)
+	running = len(readers)
+	try:
+		while running:
+			prefix, b = q.get()
+			if b is None:
+				running -= 1
+			else:
+				parse_line(b, prefix=prefix)
+	except:
+		debug( "Killing process {}".format(proc.pid) )
+		proc.kill()
+		while running: # let the reader threads see EOF
+			_, b = q.get()
+			if b is None:
+				running -= 1
+		raise
+	finally:
+		for t in readers:
+			t.join()
+	return (wait or proc.wait)()
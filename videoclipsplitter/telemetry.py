@@ -0,0 +1,129 @@
+"""
+Resource accounting for each command, and throughput for each job, written as
+JSON lines:
+
+	{"event": "command", "converter": "ffmpeg", "wall_s": 12.1, "user_s": 3.2, ...}
+	{"event": "job", "converter": "ffmpeg", "mb_per_s": 410.5, "read_mb_per_s": 52.3, ...}
+
+mb_per_s is the whole input over wall time. read_mb_per_s counts only what
+the converter was expected to read, as modelled by planner.get_bytes_read(),
+so it compares with planner estimates.
+
+CPU time, peak RSS and block I/O come from os.wait4() on each child, so they
+stay correct when commands run in parallel. block_read_bytes counts only reads
+that reached the disk, not those served from the page cache, so it is not a
+measure of how much input was processed. Where os.wait4() isn't available,
+only wall time is recorded.
+"""
+import json
+import os, os.path
+import sys
+import threading
+import time
+
+
+try:
+	"""
+	If used in a package, package logging functions are used instead of stderr.
+	"""
+	from . import debug, info, warning, error, fatal
+except:
+	def error(*args, **kwargs):
+		print(*args, file=sys.stderr, **kwargs)
+	debug = info = warning = fatal = error
+
+
+# ru_maxrss is in kilobytes on Linux, bytes on macOS
+maxrss_scale = 1 if sys.platform.startswith('darwin') else 1024
+block_size = 512 # ru_inblock and ru_oublock units
+
+
+def wait4(proc):
+	'''
+	Reaps proc, returning (returncode, usage dict). usage is empty without os.wait4.
+	'''
+	if not hasattr(os, 'wait4'):
+		return proc.wait(), {}
+	_, status, ru = os.wait4(proc.pid, 0)
+	proc.returncode = os.waitstatus_to_exitcode(status)
+	return proc.returncode, { 'user_s': ru.ru_utime,
+							  'sys_s': ru.ru_stime,
+							  'max_rss_bytes': ru.ru_maxrss*maxrss_scale,
+							  'block_read_bytes': ru.ru_inblock*block_size,
+							  'block_written_bytes': ru.ru_oublock*block_size }
+
+
+class Telemetry:
+	'''
+	Appends records to a JSON lines file, safely from many threads
+	'''
+	def __init__(self, filename):
+		self.filename = filename
+		self.lock = threading.Lock()
+	def write(self, record):
+		with self.lock, open(self.filename, 'a') as ofo:
+			ofo.write(json.dumps(record)+'\n')
+	def job(self, converter, input_filename, bytes_read=None):
+		return JobTelemetry(self, converter, input_filename, bytes_read=bytes_read)
+class JobTelemetry:
+	'''
+	Collects the commands run by one converter on one input
+	'''
+	def __init__(self, telemetry, converter, input_filename, bytes_read=None):
+		self.telemetry = telemetry
+		self.converter, self.input_filename = converter, input_filename
+		self.bytes_read = bytes_read
+		self.started = time.perf_counter()
+		self.lock = threading.Lock()
+		self.commands = 0
+		self.cpu_s = 0.
+		self.output_bytes = 0
+	def command(self, argv, wall_s, returncode, usage, outputs=()):
+		output_bytes = sum(os.path.getsize(fn) for fn in outputs if os.path.isfile(fn))
+		with self.lock:
+			self.commands += 1
+			self.cpu_s += usage.get('user_s', 0.)+usage.get('sys_s', 0.)
+			self.output_bytes += output_bytes
+		record = { 'event': 'command',
+				   'time': time.time(),
+				   'converter': self.converter,
+				   'input': self.input_filename,
+				   'argv': argv,
+				   'returncode': returncode,
+				   'wall_s': wall_s,
+				   'output_bytes': output_bytes }
+		record.update(usage)
+		self.telemetry.write(record)
+	def finish(self, success):
+		'''
+		Writes the job record and returns it
+		'''
+		wall_s = time.perf_counter()-self.started
+		try:
+			from .FFprobe import get_duration
+			media_seconds = get_duration(self.input_filename).total_seconds()
+		except Exception as e:
+			debug( "No duration for {}: {}".format(self.input_filename, e) )
+			media_seconds = None
+		input_bytes = os.path.getsize(self.input_filename) if os.path.isfile(self.input_filename) else None
+		record = { 'event': 'job',
+				   'time': time.time(),
+				   'converter': self.converter,
+				   'input': self.input_filename,
+				   'container': os.path.splitext(self.input_filename)[-1].upper(),
+				   'success': success,
+				   'commands': self.commands,
+				   'wall_s': wall_s,
+				   'cpu_s': self.cpu_s,
+				   'input_bytes': input_bytes,
+				   'bytes_read': self.bytes_read,
+				   'output_bytes': self.output_bytes,
+				   'media_s': media_seconds,
+				   'mb_per_s': input_bytes/wall_s/1e6 if (input_bytes is not None and wall_s) else None,
+				   'read_mb_per_s': self.bytes_read/wall_s/1e6 if (self.bytes_read is not None and wall_s) else None,
+				   'realtime_factor': media_seconds/wall_s if (media_seconds and wall_s) else None }
+		self.telemetry.write(record)
+		info( "{} on {}: {:.1f}s, {} MB/s, {}x realtime".format(self.converter, self.input_filename, wall_s,
+			'?' if record['mb_per_s'] is None else '{:.1f}'.format(record['mb_per_s']),
+			'?' if record['realtime_factor'] is None else '{:.1f}'.format(record['realtime_factor'])) )
+		return record
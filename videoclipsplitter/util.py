@@ -1,32 +1,45 @@
 #!/usr/bin/env python3
-from pprint import pformat
 
 class TinyPyException(Exception):
 	pass
 #
 def wrap(*args, **kwargs):
 	'''return lines that form a repr() suitable for TinyPy'''
+	from pprint import pformat
 	lines = pformat(*args, **kwargs).splitlines()
 	if any(255 < len(_) for _ in lines):
 		raise TinyPyException("Line limit 255 reached")
 	for n, line in enumerate(lines, start=1-len(lines)):
 		yield line+'\\' if n else line
 #
+class DuplicateFilter:
+	'''
+	Collapses runs of identical lines, one line at a time: feed() and close()
+	return the lines to pass on.
+	'''
+	def __init__(self, prev=hash(''), n=0, encoding='UTF-8'):
+		self.prev, self.n = prev, n
+		self.encoding = encoding
+	def repeats(self):
+		return [ "(Last message repeats {} more times)".format(self.n-1).encode(self.encoding) ] if 1 < self.n else []
+	def feed(self, line):
+		this = hash(line)
+		if this == self.prev:
+			self.n += 1
+			return []
+		lines = self.repeats()+[ line ]
+		self.prev, self.n = this, 1
+		return lines
+	def close(self):
+		lines = self.repeats()
+		self.n = 0
+		return lines
+#
 def avoid_duplicates(iterable, prev=hash(''), n=0, encoding='UTF-8'):
+	f = DuplicateFilter(prev, n, encoding)
 	for line in iterable:
-		this = hash(line)
-		if this == prev:
-			n += 1
-		else:
-			if 1 < n:
-				yield "(Last message repeats {} more times)".format(n-1).encode(encoding)
-				yield line
-			else:
-				yield line
-			n = 1
-		prev = this
-	if prev: # exists when last line wasn't empty
-		yield line
+		yield from f.feed(line)
+	yield from f.close()
 #
 def flatten(iterable):
 	for item in iterable: